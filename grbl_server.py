@@ -17,12 +17,16 @@ Usage: python3 grbl_server.py [--port 8000] [--serial /dev/ttyACM0]
 
 import asyncio
 import collections
+import gzip
+import hashlib
 import json
+import math
 import re
 import time
 import os
 import argparse
 import smtplib
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
 from pathlib import Path
 from typing import Optional, Dict, Any, List, Set
@@ -33,13 +37,37 @@ import serial
 import serial.tools.list_ports
 import websockets
 from websockets.http11 import Response
+from websockets.datastructures import Headers
+from websockets.extensions.permessage_deflate import ServerPerMessageDeflateFactory
 from http import HTTPStatus
-import http.server
-import socketserver
 import threading
+import queue
 
 import logging
 
+# orjson is optional — much faster serialization on the broadcast hot path
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson:
+    def _dumps(obj) -> str:
+        # Decode to str: jog.html expects text frames (JSON.parse on event.data)
+        return orjson.dumps(obj).decode()
+
+    _loads = orjson.loads
+else:
+    def _dumps(obj) -> str:
+        # Compact separators to match orjson's output shape
+        return json.dumps(obj, separators=(',', ':'))
+
+    _loads = json.loads
+
+# Constant reply frames — serialized once at import time
+_FRAME_DISCONNECTED = _dumps({'type': 'disconnected'})
+_FRAME_BAD_JSON = _dumps({'type': 'error', 'message': 'Invalid JSON'})
+
 from macros import MacroEngine
 
 # Error log file - persistent across restarts
@@ -63,6 +91,7 @@ DEFAULT_SERIAL_PORT = '/dev/ttyGRBL'
 DEFAULT_BAUD_RATE = 115200
 STATUS_POLL_INTERVAL = 0.2  # 200ms
 RECOVERY_SAVE_INTERVAL = 100  # Save recovery every N lines
+GRBL_RX_BUFFER_SIZE = 128  # GRBL serial RX buffer (char-counting streamer window)
 LOG_DIR = 'logs'
 LOG_MAX_AGE_DAYS = 7
 
@@ -81,29 +110,66 @@ SMS_APP_PASSWORD = 'hgtv igwu kmhu fdad'
 SMS_TO_ADDRESS = '2674743645@tmomail.net'
 
 
-def send_sms(message: str) -> bool:
-    """Send SMS notification via email-to-SMS gateway."""
-    if not SMS_ENABLED:
-        return False
+class SMSClient:
+    """Email-to-SMS sender with a persistent SMTP connection.
+
+    starttls + login is 3+ round-trips (~200 ms); reconnecting per
+    message made a burst of notifications (job start, tool change,
+    error) tie up a worker thread for most of a second. The connection
+    is kept open between sends and rebuilt on failure, with one retry.
+    Thread-safe: send() runs on executor threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._smtp: Optional[smtplib.SMTP] = None
+
+    def _connect(self):
+        self._smtp = smtplib.SMTP(SMS_SMTP_SERVER, SMS_SMTP_PORT, timeout=15)
+        self._smtp.starttls()
+        self._smtp.login(SMS_FROM_EMAIL, SMS_APP_PASSWORD)
+
+    def _close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.close()
+            except Exception:
+                pass
+            self._smtp = None
+
+    def send(self, message: str) -> bool:
+        if not SMS_ENABLED:
+            return False
 
-    try:
         msg = MIMEText(message)
         msg['From'] = SMS_FROM_EMAIL
         msg['To'] = SMS_TO_ADDRESS
         msg['Subject'] = ''  # SMS doesn't use subject
 
-        with smtplib.SMTP(SMS_SMTP_SERVER, SMS_SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMS_FROM_EMAIL, SMS_APP_PASSWORD)
-            server.send_message(msg)
-
-        print(f'[SMS] Sent: {message}')
-        return True
-    except Exception as e:
-        print(f'[SMS] Failed to send: {e}')
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._smtp is None:
+                        self._connect()
+                    self._smtp.send_message(msg)
+                    print(f'[SMS] Sent: {message}')
+                    return True
+                except Exception as e:
+                    # Stale/dropped connection — rebuild and retry once
+                    self._close()
+                    if attempt == 1:
+                        print(f'[SMS] Failed to send: {e}')
         return False
 
 
+_sms_client = SMSClient()
+
+
+def send_sms(message: str) -> bool:
+    """Send SMS notification via email-to-SMS gateway."""
+    return _sms_client.send(message)
+
+
 async def send_sms_async(message: str) -> bool:
     """Async wrapper for send_sms."""
     loop = asyncio.get_event_loop()
@@ -114,13 +180,27 @@ async def send_sms_async(message: str) -> bool:
 # ============================================================
 
 class SerialLogger:
-    """Logs all serial communication to daily text files with auto-cleanup."""
+    """Logs all serial communication to daily text files with auto-cleanup.
+
+    Lines are buffered in memory and flushed by a background task (or
+    when the buffer grows large) so the serial hot path never pays an
+    open/write/close per line.
+    """
+
+    FLUSH_INTERVAL = 0.1       # seconds between background flushes
+    FLUSH_THRESHOLD = 65536    # flush immediately past this many buffered bytes
 
     def __init__(self, log_dir: str = LOG_DIR):
         self.log_dir = Path(log_dir)
         self.log_dir.mkdir(exist_ok=True)
         self.current_file: Optional[Path] = None
         self.current_date: str = ''
+        self._buf = bytearray()
+        self._lock = threading.Lock()
+        self._fh = None
+        self._fh_path: Optional[Path] = None
+        self._sec_int: int = 0        # second the cached prefix was formatted for
+        self._sec_prefix: str = ''    # 'HH:MM:SS.' — strftime only once per second
         self._cleanup_old_logs()
 
     def _cleanup_old_logs(self):
@@ -158,15 +238,43 @@ class SerialLogger:
         self._write(f'>RT {name}')
 
     def _write(self, msg: str):
-        """Write timestamped message to log file."""
-        timestamp = time.strftime('%H:%M:%S.') + f'{int(time.time() * 1000) % 1000:03d}'
+        """Buffer a timestamped message for the background flusher."""
+        ns = time.time_ns()
+        sec = ns // 1_000_000_000
+        if sec != self._sec_int:
+            self._sec_int = sec
+            self._sec_prefix = time.strftime('%H:%M:%S.', time.localtime(sec))
+        timestamp = f'{self._sec_prefix}{(ns // 1_000_000) % 1000:03d}'
+        with self._lock:
+            self._buf.extend(f'{timestamp} {msg}\n'.encode())
+            oversize = len(self._buf) > self.FLUSH_THRESHOLD
+        if oversize:
+            self.flush()
+
+    def flush(self):
+        """Write buffered lines to the current day's log file."""
+        with self._lock:
+            if not self._buf:
+                return
+            buf, self._buf = self._buf, bytearray()
         log_file = self._get_log_file()
         try:
-            with open(log_file, 'a') as f:
-                f.write(f'{timestamp} {msg}\n')
+            if self._fh is None or self._fh_path != log_file:
+                if self._fh:
+                    self._fh.close()
+                self._fh = open(log_file, 'ab')
+                self._fh_path = log_file
+            self._fh.write(buf)
+            self._fh.flush()
         except Exception as e:
             print(f'[Logger] Write error: {e}')
 
+    async def run_flusher(self):
+        """Background task: flush the log buffer every FLUSH_INTERVAL."""
+        while True:
+            await asyncio.sleep(self.FLUSH_INTERVAL)
+            self.flush()
+
 # ============================================================
 # DATA CLASSES
 # ============================================================
@@ -182,24 +290,85 @@ class MachineStatus:
     feed_rate: float = 0
     spindle_speed: float = 0
     pins: str = ''
+    _template: Dict[str, Any] = field(default_factory=dict, repr=False)
 
     def to_dict(self) -> Dict[str, Any]:
-        return {
-            'type': 'status',
-            'state': self.state,
-            'mpos': self.mpos,
-            'wpos': self.wpos,
-            'feed_override': self.feed_override,
-            'spindle_override': self.spindle_override,
-            'feed_rate': self.feed_rate,
-            'spindle_speed': self.spindle_speed,
-            'pins': self.pins,
-        }
+        # Reuse one dict — callers serialize it before the next status arrives
+        d = self._template
+        d['type'] = 'status'
+        d['state'] = self.state
+        d['mpos'] = self.mpos
+        d['wpos'] = self.wpos
+        d['feed_override'] = self.feed_override
+        d['spindle_override'] = self.spindle_override
+        d['feed_rate'] = self.feed_rate
+        d['spindle_speed'] = self.spindle_speed
+        d['pins'] = self.pins
+        return d
 
 # ============================================================
 # GRBL CONNECTION
 # ============================================================
 
+_AXES = ('x', 'y', 'z', 'a')
+
+# Status report fields: <Idle|MPos:0.000,0.000,0.000,0.000|FS:0,0|WCO:...|Ov:...|Pn:...>
+_STATUS_FIELD_RE = re.compile(r'\|(MPos|WCO|Ov|FS|F|Pn):([^|>]*)')
+
+# Probe result: [PRB:x,y,z,a:1] - 1 means success
+_PRB_RE = re.compile(r'\[PRB:([^:]+):(\d)\]')
+
+def _parse_gcode_line(line: str):
+    """Single-pass G-code word scanner for analyze_gcode.
+
+    Returns (words, gcodes, mcodes): `words` maps F/X/Y/Z/S letters to
+    their numeric value (first occurrence, like the regexes it
+    replaces), `gcodes`/`mcodes` collect the integer G/M codes on the
+    line. One left-to-right traversal replaces five regex searches plus
+    substring scans per line; ';' and '(...)' comments are skipped, so
+    a value mentioned in a comment no longer counts.
+    """
+    words: Dict[str, float] = {}
+    gcodes: Set[int] = set()
+    mcodes: Set[int] = set()
+    i = 0
+    n = len(line)
+    while i < n:
+        c = line[i]
+        if c == ';':
+            break
+        if c == '(':
+            end = line.find(')', i + 1)
+            if end == -1:
+                break
+            i = end + 1
+            continue
+        if c.isalpha():
+            letter = c.upper()
+            j = i + 1
+            if j < n and line[j] in '+-':
+                j += 1
+            num_start = j
+            while j < n and (line[j].isdigit() or line[j] == '.'):
+                j += 1
+            if j > num_start:
+                num = line[i + 1:j]
+                try:
+                    if letter in 'FXYZS':
+                        if letter not in words:
+                            words[letter] = float(num)
+                    elif letter == 'G':
+                        gcodes.add(int(float(num)))
+                    elif letter == 'M':
+                        mcodes.add(int(float(num)))
+                except ValueError:
+                    pass
+            i = j
+            continue
+        i += 1
+    return words, gcodes, mcodes
+
+
 class GrblConnection:
     """Manages serial connection to GRBL controller with DTR-safe handling."""
 
@@ -208,11 +377,22 @@ class GrblConnection:
         self.port: str = ''
         self.connected: bool = False
         self.status: MachineStatus = MachineStatus()
+        self.status_dirty: bool = True  # set by _parse_status on real changes
+        self._last_status_broadcast: float = 0.0
         self.settings: Dict[str, str] = {}
-        self.response_queue: asyncio.Queue = asyncio.Queue()
+        self._pending: Optional[asyncio.Future] = None  # in-flight send_command response
+        self._cmd_lock: asyncio.Lock = asyncio.Lock()  # one command in flight at a time
         self.stream_queue: asyncio.Queue = asyncio.Queue()  # for character-counting streamer
+        self.idle_event: asyncio.Event = asyncio.Event()  # set while last report was Idle
         self.streaming: bool = False  # when True, ok/error go to stream_queue
         self.read_task: Optional[asyncio.Task] = None
+        self._line_queue: asyncio.Queue = asyncio.Queue()  # complete lines from _on_readable
+        self._rx_buffer: bytearray = bytearray()  # raw bytes; decoded per complete line
+        self._use_fd_reader: bool = False  # True when the fd is registered on the event loop
+        self._read_executor: Optional[ThreadPoolExecutor] = None  # fallback read loop only
+        self._write_queue: Optional[queue.SimpleQueue] = None  # drained by writer thread
+        self._writer: Optional[threading.Thread] = None
+        self._last_write_ts: float = 0.0  # last non-poll send (adaptive poll cadence)
         self.poll_task: Optional[asyncio.Task] = None
         self.broadcast_callback = None
         self.wco_cached: Dict[str, float] = {'x': 0, 'y': 0, 'z': 0, 'a': 0}
@@ -234,12 +414,14 @@ class GrblConnection:
             self.ser.dsrdtr = False  # Disable DTR/DSR flow control
             self.ser.open()
             self.ser.dtr = False     # Explicitly hold DTR low after opening
+            self._set_low_latency()
+            self._start_writer()
 
             self.port = port
             self.connected = True
 
-            # Start read loop and status polling
-            self.read_task = asyncio.create_task(self._read_loop())
+            # Start serial reader and status polling
+            self._start_reader()
             self.poll_task = asyncio.create_task(self._poll_status())
 
             # Request settings and stored positions
@@ -254,9 +436,72 @@ class GrblConnection:
             self.connected = False
             return False
 
+    def _set_low_latency(self):
+        """Ask the USB-serial driver for low-latency mode.
+
+        FTDI adapters default to a 16 ms latency timer that batches RX
+        bytes before raising the interrupt — most of a status report's
+        round-trip at 115200 baud. Not every driver supports the ioctl
+        (CDC-ACM boards don't need it), so failure is only logged.
+        """
+        try:
+            self.ser.set_low_latency_mode(True)
+            elog('Serial: low-latency mode enabled')
+        except (AttributeError, ValueError, OSError) as e:
+            elog(f'Serial: low-latency mode unavailable ({e})')
+
+    def _start_writer(self):
+        """Start the dedicated serial writer thread for the current port."""
+        self._write_queue = queue.SimpleQueue()
+        self._writer = threading.Thread(
+            target=self._writer_loop,
+            args=(self.ser, self._write_queue, asyncio.get_event_loop()),
+            name='serial-write', daemon=True)
+        self._writer.start()
+
+    def _stop_writer(self):
+        """Signal the writer thread to exit."""
+        if self._write_queue is not None:
+            self._write_queue.put(None)
+        self._write_queue = None
+        self._writer = None
+
+    def _writer_loop(self, ser, wq: 'queue.SimpleQueue', loop):
+        """Drain the write queue onto the serial port (dedicated thread).
+
+        pyserial's write blocks until the kernel accepts the bytes, which
+        on a congested USB link can stall the caller for milliseconds —
+        enough to skew the status-poll cadence when that caller is the
+        event loop. Only this thread ever calls ser.write; event-loop code
+        just enqueues. Exits on the None sentinel; a write error hands
+        the port to _reconnect on the event loop so a write-dead link is
+        recovered like a read-dead one instead of silently swallowing
+        every queued byte (including '!' and soft-reset).
+        """
+        while True:
+            data = wq.get()
+            if data is None:
+                return
+            try:
+                ser.write(data)
+            except Exception as e:
+                elog(f'Serial writer: write failed: {e}')
+                asyncio.run_coroutine_threadsafe(self._reconnect(e), loop)
+                return
+
+    def _write(self, data: bytes):
+        """Queue bytes for the writer thread (never blocks the event loop)."""
+        if data != b'?':  # status polls don't count as activity
+            self._last_write_ts = time.monotonic()
+        wq = self._write_queue
+        if wq is not None:
+            wq.put(data)
+
     async def disconnect(self):
         """Disconnect from serial port."""
         self.connected = False
+        self._stop_reader()
+        self._stop_writer()
 
         if self.read_task:
             self.read_task.cancel()
@@ -278,309 +523,462 @@ class GrblConnection:
             self.ser.close()
         self.ser = None
         self.port = ''
+
+        if self._read_executor:
+            self._read_executor.shutdown(wait=False)
+            self._read_executor = None
+
         print('[GRBL] Disconnected')
 
+    def _start_reader(self):
+        """Start consuming serial data.
+
+        Registers the serial fd directly on the event loop so bytes are
+        handled the moment the kernel marks the fd readable — no executor
+        round-trip and no polling sleep. Falls back to executor-based
+        polling where add_reader doesn't support the fd (e.g. Windows).
+        """
+        loop = asyncio.get_event_loop()
+        self._rx_buffer.clear()
+        try:
+            loop.add_reader(self.ser.fileno(), self._on_readable)
+            self._use_fd_reader = True
+            self.read_task = asyncio.create_task(self._line_loop())
+        except (NotImplementedError, ValueError, OSError):
+            self._use_fd_reader = False
+            self.read_task = asyncio.create_task(self._read_loop())
+
+    def _stop_reader(self):
+        """Unregister the serial fd from the event loop."""
+        if self._use_fd_reader and self.ser:
+            try:
+                asyncio.get_event_loop().remove_reader(self.ser.fileno())
+            except Exception:
+                pass
+            self._use_fd_reader = False
+
+    def _on_readable(self):
+        """Drain buffered serial bytes (event loop callback, fd readable)."""
+        try:
+            data = self.ser.read(self.ser.in_waiting or 1)
+        except Exception as e:
+            self._stop_reader()
+            asyncio.create_task(self._reconnect(e))
+            return
+        if not data:
+            return
+        buf = self._rx_buffer
+        buf.extend(data)
+
+        # Queue complete lines for _line_loop (decode only finished lines)
+        while (nl := buf.find(b'\n')) != -1:
+            line = bytes(buf[:nl]).decode('utf-8', errors='ignore').strip()
+            del buf[:nl + 1]
+            if line:
+                self._line_queue.put_nowait(line)
+
+    async def _line_loop(self):
+        """Process complete lines queued by _on_readable."""
+        while self.connected:
+            line = await self._line_queue.get()
+            await self._handle_line(line)
+
     async def _read_loop(self):
-        """Async loop to read serial data."""
+        """Fallback async loop: poll serial via executor (non-Linux)."""
         loop = asyncio.get_event_loop()
-        buffer = ''
+        if self._read_executor is None:
+            # Dedicated single worker: avoids queueing behind other
+            # default-executor jobs (SMS sends, file writes) and keeps the
+            # read on a warm thread instead of re-dispatching each poll.
+            self._read_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='serial-read')
 
+        read = self.ser.read  # bound once — no per-iteration lambda
         while self.connected and self.ser:
             try:
-                # Non-blocking read in executor
-                data = await loop.run_in_executor(None, lambda: self.ser.read(256) if self.ser else b'')
+                data = await loop.run_in_executor(self._read_executor, read, 256)
                 if data:
-                    buffer += data.decode('utf-8', errors='ignore')
+                    buf = self._rx_buffer
+                    buf.extend(data)
 
                     # Process complete lines
-                    while '\n' in buffer:
-                        line, buffer = buffer.split('\n', 1)
-                        line = line.strip()
+                    while (nl := buf.find(b'\n')) != -1:
+                        line = bytes(buf[:nl]).decode('utf-8', errors='ignore').strip()
+                        del buf[:nl + 1]
                         if line:
                             await self._handle_line(line)
                 else:
                     await asyncio.sleep(0.01)
 
             except Exception as e:
-                if self.connected:
-                    elog(f'GRBL read error: {e} — attempting reconnect')
-                    if self.broadcast_callback:
-                        await self.broadcast_callback({'type': 'error', 'message': f'Controller lost: {e} — reconnecting...'})
-                    # Try to reconnect
-                    old_port = self.port
-                    self.connected = False
-                    try:
-                        if self.ser:
-                            self.ser.close()
-                    except:
-                        pass
-                    for attempt in range(30):
-                        await asyncio.sleep(2)
-                        try:
-                            self.ser = serial.Serial()
-                            self.ser.port = old_port
-                            self.ser.baudrate = DEFAULT_BAUD_RATE
-                            self.ser.timeout = 0.1
-                            self.ser.dsrdtr = False
-                            self.ser.open()
-                            self.ser.dtr = False
-                            self.connected = True
-                            elog(f'GRBL reconnected to {old_port} (attempt {attempt + 1})')
-                            if self.broadcast_callback:
-                                await self.broadcast_callback({'type': 'error', 'message': f'Controller reconnected'})
-                            # Restart status polling
-                            self.poll_task = asyncio.create_task(self._poll_status())
-                            # Re-request settings
-                            await self.send_command('$X')
-                            await self.send_command('$$')
-                            await self.send_command('$#')
-                            break
-                        except Exception as re:
-                            if attempt % 5 == 0:
-                                elog(f'GRBL reconnect attempt {attempt + 1} failed: {re}')
-                    if not self.connected:
-                        elog('GRBL reconnect failed after 30 attempts')
-                        if self.broadcast_callback:
-                            await self.broadcast_callback({'type': 'error', 'message': 'Controller reconnect failed after 60 seconds'})
-                        break
-                    continue  # resume read loop
+                # _reconnect restarts the reader task itself (fd or
+                # executor path) — this loop is stale either way
+                await self._reconnect(e)
+                break
+
+    async def _reconnect(self, error: Exception):
+        """Reopen the serial port after a read or write error."""
+        if not self.connected:
+            return
+        elog(f'GRBL read error: {error} — attempting reconnect')
+        if self.broadcast_callback:
+            await self.broadcast_callback({'type': 'error', 'message': f'Controller lost: {error} — reconnecting...'})
+        old_port = self.port
+        self.connected = False
+        self._stop_writer()
+        self._stop_reader()  # unregister the old fd before closing it
+        try:
+            if self.ser:
+                self.ser.close()
+        except:
+            pass
+        for attempt in range(30):
+            await asyncio.sleep(2)
+            try:
+                self.ser = serial.Serial()
+                self.ser.port = old_port
+                self.ser.baudrate = DEFAULT_BAUD_RATE
+                self.ser.timeout = 0.1
+                self.ser.dsrdtr = False
+                self.ser.open()
+                self.ser.dtr = False
+                self._set_low_latency()
+                self._start_writer()
+                self.connected = True
+                elog(f'GRBL reconnected to {old_port} (attempt {attempt + 1})')
+                if self.broadcast_callback:
+                    await self.broadcast_callback({'type': 'error', 'message': f'Controller reconnected'})
+                # Re-register the fd reader on the new port
+                self._rx_buffer.clear()
+                try:
+                    asyncio.get_event_loop().add_reader(self.ser.fileno(), self._on_readable)
+                    self._use_fd_reader = True
+                except (NotImplementedError, ValueError, OSError):
+                    self._use_fd_reader = False
+                # Restart the line consumer — _line_loop exits if it saw
+                # connected == False mid-burst, so never assume it
+                # survived. Skip the cancel when _reconnect is running
+                # inside the old read task (_read_loop breaks on return).
+                stale = self.read_task
+                if stale and stale is not asyncio.current_task() and not stale.done():
+                    stale.cancel()
+                if self._use_fd_reader:
+                    self.read_task = asyncio.create_task(self._line_loop())
+                else:
+                    self.read_task = asyncio.create_task(self._read_loop())
+                # Restart status polling
+                self.poll_task = asyncio.create_task(self._poll_status())
+                # Re-request settings
+                await self.send_command('$X')
+                await self.send_command('$$')
+                await self.send_command('$#')
+                break
+            except Exception as re:
+                if attempt % 5 == 0:
+                    elog(f'GRBL reconnect attempt {attempt + 1} failed: {re}')
+        if not self.connected:
+            elog('GRBL reconnect failed after 30 attempts')
+            if self.broadcast_callback:
+                await self.broadcast_callback({'type': 'error', 'message': 'Controller reconnect failed after 60 seconds'})
 
     async def _handle_line(self, line: str):
-        """Process a line received from GRBL."""
+        """Process a line received from GRBL.
+
+        Every line class GRBL emits is distinguishable by its first
+        character, so dispatch through a dict instead of walking a
+        startswith() cascade — status lines arrive at 10 Hz and always
+        hit the hot branch first anyway.
+        """
         # Log to file
         if self.logger:
             self.logger.log_receive(line)
 
-        # Broadcast raw serial data
-        if self.broadcast_callback:
+        # Broadcast raw serial data — except status reports, which the UI
+        # never shows raw (it renders the parsed 'status' broadcast) and
+        # which would otherwise double the wire traffic at 10 Hz
+        if self.broadcast_callback and not line.startswith('<'):
             await self.broadcast_callback({'type': 'serial_read', 'line': line})
 
-        # Status response: <Idle|MPos:0.000,0.000,0.000,0.000|...>
-        if line.startswith('<') and line.endswith('>'):
+        handler = self._LINE_HANDLERS.get(line[0]) if line else None
+        if handler:
+            await handler(self, line)
+
+    async def _on_status_line(self, line: str):
+        """Status response: <Idle|MPos:0.000,0.000,0.000,0.000|...>"""
+        if line.endswith('>'):
             self._parse_status(line)
             if self.broadcast_callback:
-                await self.broadcast_callback(self.status.to_dict())
-            return
-
-        # Program end
-        if '[MSG:Pgm End]' in line:
-            elog('GRBL: Program End')
-            self.pgm_ended = True
-
-        # OK response
-        if line == 'ok':
-            if self.streaming:
-                await self.stream_queue.put(('ok', line))
-            else:
-                await self.response_queue.put(('ok', line))
+                # Idle poll spam is coalesced: rebroadcast only when a
+                # field changed, with a 1 s keepalive so a client that
+                # missed a frame converges anyway
+                now = time.monotonic()
+                if self.status_dirty or now - self._last_status_broadcast >= 1.0:
+                    self._last_status_broadcast = now
+                    await self.broadcast_callback(self.status.to_dict())
+
+    async def _on_ok(self, line: str):
+        if line != 'ok':
             return
+        if self.streaming:
+            await self.stream_queue.put(('ok', line))
+        else:
+            self._resolve_pending(line)
 
-        # Error response
-        if line.startswith('error:'):
-            elog(f'GRBL error: {line}')
-            if self.streaming:
-                await self.stream_queue.put(('error', line))
-            else:
-                await self.response_queue.put(('error', line))
-            if self.broadcast_callback:
-                await self.broadcast_callback({'type': 'response', 'result': line})
+    async def _on_error(self, line: str):
+        if not line.startswith('error:'):
             return
+        elog(f'GRBL error: {line}')
+        if self.streaming:
+            await self.stream_queue.put(('error', line))
+        else:
+            self._resolve_pending(line)
+        if self.broadcast_callback:
+            await self.broadcast_callback({'type': 'response', 'result': line})
 
-        # Alarm
-        if line.startswith('ALARM:'):
-            code = line.split(':')[1] if ':' in line else '?'
-            elog(f'ALARM: {code}')
-            self.status.state = 'Alarm'
-            if self.broadcast_callback:
-                await self.broadcast_callback({'type': 'alarm', 'code': code})
+    async def _on_alarm(self, line: str):
+        if not line.startswith('ALARM:'):
             return
+        code = line.split(':')[1] if ':' in line else '?'
+        elog(f'ALARM: {code}')
+        self.status.state = 'Alarm'
+        self.idle_event.clear()
+        if self.broadcast_callback:
+            await self.broadcast_callback({'type': 'alarm', 'code': code})
 
+    async def _on_bracket(self, line: str):
+        """Feedback messages: [PRB:...], [G28:...], [MSG:...]"""
         # Probe result: [PRB:x,y,z,a:1]
         if line.startswith('[PRB:'):
-            self._parse_probe(line)
-            return
+            await self._parse_probe(line)
 
         # G28 stored position: [G28:x,y,z,a]
-        if line.startswith('[G28:'):
+        elif line.startswith('[G28:'):
             coords = line[5:-1].split(',')
-            self.g28_pos = {
-                'x': float(coords[0]) if len(coords) > 0 else 0,
-                'y': float(coords[1]) if len(coords) > 1 else 0,
-                'z': float(coords[2]) if len(coords) > 2 else 0,
-                'a': float(coords[3]) if len(coords) > 3 else 0,
-            }
-            elog(f'G28 pos: X{self.g28_pos["x"]} Y{self.g28_pos["y"]} Z{self.g28_pos["z"]}')
-            return
+            g28 = self.g28_pos  # mutate in place — macros hold a reference
+            for i, axis in enumerate(_AXES):
+                g28[axis] = float(coords[i]) if len(coords) > i else 0
+            elog(f'G28 pos: X{g28["x"]} Y{g28["y"]} Z{g28["z"]}')
 
-        # Settings: $N=value (already broadcast via serial_read above)
-        if line.startswith('$') and '=' in line:
+        # Program end
+        elif '[MSG:Pgm End]' in line:
+            elog('GRBL: Program End')
+            self.pgm_ended = True
+
+    async def _on_setting(self, line: str):
+        """Settings: $N=value (already broadcast via serial_read above)"""
+        if '=' in line:
             key, value = line.split('=', 1)
             self.settings[key] = value
-            return
 
-        # Grbl startup
+    async def _on_banner(self, line: str):
+        """Grbl startup banner."""
         if 'Grbl' in line:
             print(f'[GRBL] Controller: {line}')
-            return
+
+    _LINE_HANDLERS = {
+        '<': _on_status_line,
+        'o': _on_ok,
+        'e': _on_error,
+        'A': _on_alarm,
+        '[': _on_bracket,
+        '$': _on_setting,
+        'G': _on_banner,
+    }
 
     def _parse_status(self, line: str):
-        """Parse GRBL status response."""
-        # Remove < >
-        content = line[1:-1]
-        parts = content.split('|')
-
-        if parts:
-            new_state = parts[0]
-            if new_state != self.status.state:
-                m = self.status.mpos
-                w = self.status.wpos
-                elog(f'State: {self.status.state} -> {new_state} MPos:({m["x"]:.3f},{m["y"]:.3f},{m["z"]:.3f},{m["a"]:.3f}) WPos:({w["x"]:.3f},{w["y"]:.3f},{w["z"]:.3f},{w["a"]:.3f}) F:{self.status.feed_override}% S:{self.status.spindle_override}%')
-            self.status.state = new_state
-
-        for part in parts[1:]:
-            if part.startswith('MPos:'):
-                coords = part[5:].split(',')
-                self.status.mpos = {
-                    'x': float(coords[0]) if len(coords) > 0 else 0,
-                    'y': float(coords[1]) if len(coords) > 1 else 0,
-                    'z': float(coords[2]) if len(coords) > 2 else 0,
-                    'a': float(coords[3]) if len(coords) > 3 else 0,
-                }
-                # Compute work position from cached WCO
-                self.status.wpos = {
-                    'x': self.status.mpos['x'] - self.wco_cached['x'],
-                    'y': self.status.mpos['y'] - self.wco_cached['y'],
-                    'z': self.status.mpos['z'] - self.wco_cached['z'],
-                    'a': self.status.mpos['a'] - self.wco_cached['a'],
-                }
-
-            elif part.startswith('WCO:'):
+        """Parse GRBL status response with a single compiled-regex scan.
+
+        Sets status_dirty when any reported field actually changed, so
+        the broadcast path can reuse its cached serialization while the
+        machine sits idle.
+        """
+        status = self.status
+        changed = False
+        end = line.find('|')
+        new_state = line[1:end] if end != -1 else line[1:-1]
+        if new_state != status.state:
+            m = status.mpos
+            w = status.wpos
+            elog(f'State: {status.state} -> {new_state} MPos:({m["x"]:.3f},{m["y"]:.3f},{m["z"]:.3f},{m["a"]:.3f}) WPos:({w["x"]:.3f},{w["y"]:.3f},{w["z"]:.3f},{w["a"]:.3f}) F:{status.feed_override}% S:{status.spindle_override}%')
+            changed = True
+        status.state = new_state
+        if new_state == 'Idle':
+            self.idle_event.set()
+        else:
+            self.idle_event.clear()
+
+        update_wpos = False
+        for field_match in _STATUS_FIELD_RE.finditer(line):
+            name, value = field_match.group(1, 2)
+
+            if name == 'MPos':
+                vals = [float(v) for v in value.split(',')]
+                mpos = status.mpos
+                for i, axis in enumerate(_AXES[:len(vals)]):
+                    if mpos[axis] != vals[i]:
+                        mpos[axis] = vals[i]
+                        changed = True
+                        update_wpos = True
+
+            elif name == 'WCO':
                 # Work Coordinate Offset (sent periodically, cache it)
-                coords = part[4:].split(',')
-                new_wco = {
-                    'x': float(coords[0]) if len(coords) > 0 else 0,
-                    'y': float(coords[1]) if len(coords) > 1 else 0,
-                    'z': float(coords[2]) if len(coords) > 2 else 0,
-                    'a': float(coords[3]) if len(coords) > 3 else 0,
-                }
-                if new_wco != self.wco_cached:
-                    elog(f'WCO changed: X{new_wco["x"]:.3f} Y{new_wco["y"]:.3f} Z{new_wco["z"]:.3f} A{new_wco.get("a", 0):.3f}')
-                self.wco_cached = new_wco
-                # Recompute wpos
-                self.status.wpos = {
-                    'x': self.status.mpos['x'] - self.wco_cached['x'],
-                    'y': self.status.mpos['y'] - self.wco_cached['y'],
-                    'z': self.status.mpos['z'] - self.wco_cached['z'],
-                    'a': self.status.mpos['a'] - self.wco_cached['a'],
-                }
-
-            elif part.startswith('Ov:'):
+                vals = [float(v) for v in value.split(',')]
+                wco = self.wco_cached
+                if any(wco[axis] != vals[i] for i, axis in enumerate(_AXES[:len(vals)])):
+                    for i, axis in enumerate(_AXES[:len(vals)]):
+                        wco[axis] = vals[i]
+                    elog(f'WCO changed: X{wco["x"]:.3f} Y{wco["y"]:.3f} Z{wco["z"]:.3f} A{wco["a"]:.3f}')
+                    changed = True
+                    update_wpos = True
+
+            elif name == 'Ov':
                 # Overrides: feed,rapid,spindle
-                overrides = part[3:].split(',')
+                overrides = value.split(',')
                 new_feed_ov = int(overrides[0]) if len(overrides) > 0 else 100
                 new_spindle_ov = int(overrides[2]) if len(overrides) > 2 else 100
-                if new_feed_ov != self.status.feed_override or new_spindle_ov != self.status.spindle_override:
-                    elog(f'Override: F:{self.status.feed_override}%->{new_feed_ov}% S:{self.status.spindle_override}%->{new_spindle_ov}%')
-                self.status.feed_override = new_feed_ov
-                # overrides[1] is rapid override (not used much)
-                self.status.spindle_override = new_spindle_ov
-
-            elif part.startswith('FS:') or part.startswith('F:'):
-                # Feed and Speed: FS:feed,speed or F:feed
-                if part.startswith('FS:'):
-                    fs = part[3:].split(',')
-                    self.status.feed_rate = float(fs[0]) if len(fs) > 0 else 0
-                    self.status.spindle_speed = float(fs[1]) if len(fs) > 1 else 0
-                else:
-                    self.status.feed_rate = float(part[2:])
-
-            elif part.startswith('Pn:'):
+                if new_feed_ov != status.feed_override or new_spindle_ov != status.spindle_override:
+                    elog(f'Override: F:{status.feed_override}%->{new_feed_ov}% S:{status.spindle_override}%->{new_spindle_ov}%')
+                    changed = True
+                status.feed_override = new_feed_ov
+                # middle value is rapid override (not used much)
+                status.spindle_override = new_spindle_ov
+
+            elif name == 'FS':
+                # Feed and Speed: FS:feed,speed
+                fs = value.split(',')
+                new_feed = float(fs[0]) if len(fs) > 0 else 0
+                new_speed = float(fs[1]) if len(fs) > 1 else 0
+                if new_feed != status.feed_rate or new_speed != status.spindle_speed:
+                    changed = True
+                status.feed_rate = new_feed
+                status.spindle_speed = new_speed
+
+            elif name == 'F':
+                new_feed = float(value)
+                if new_feed != status.feed_rate:
+                    changed = True
+                status.feed_rate = new_feed
+
+            elif name == 'Pn':
                 # Input pins: X=limit, Y=limit, Z=limit, P=probe, etc.
-                self.status.pins = part[3:]
-
-    def _parse_probe(self, line: str):
+                if status.pins != value:
+                    changed = True
+                status.pins = value
+
+        if changed:
+            self.status_dirty = True
+
+        # Compute work position once per report, and only when MPos or
+        # WCO actually moved — while idle every field compares equal and
+        # the report is a no-op
+        if update_wpos:
+            mpos = status.mpos
+            wco = self.wco_cached
+            wpos = status.wpos
+            for axis in _AXES:
+                wpos[axis] = mpos[axis] - wco[axis]
+
+    async def _parse_probe(self, line: str):
         """Parse probe result."""
-        # [PRB:x,y,z,a:1] - 1 means success
-        match = re.match(r'\[PRB:([^:]+):(\d)\]', line)
+        match = _PRB_RE.match(line)
         if match:
             coords = match.group(1).split(',')
             success = match.group(2) == '1'
 
-            # Store for macro access
-            self.last_probe = {
-                'success': success,
-                'x': float(coords[0]) if len(coords) > 0 else 0,
-                'y': float(coords[1]) if len(coords) > 1 else 0,
-                'z': float(coords[2]) if len(coords) > 2 else 0,
-                'a': float(coords[3]) if len(coords) > 3 else 0,
-            }
+            # Store for macro access (in place — macros hold a reference)
+            probe = self.last_probe
+            probe['success'] = success
+            for i, axis in enumerate(_AXES):
+                probe[axis] = float(coords[i]) if len(coords) > i else 0
 
             if self.broadcast_callback:
-                asyncio.create_task(self.broadcast_callback({
+                # Awaited directly — we're already on the event loop, so
+                # spawning a task per probe just adds scheduling overhead
+                await self.broadcast_callback({
                     'type': 'probe',
                     **self.last_probe
-                }))
+                })
 
     async def _poll_status(self):
-        """Periodically send status query."""
+        """Periodically send status query.
+
+        Polls at full rate while the machine is in motion or a command
+        went out in the last second; otherwise backs off 5x — an idle,
+        quiet machine can't change state between polls.
+        """
         while self.connected:
             try:
                 self.send_realtime(b'?')
-                await asyncio.sleep(STATUS_POLL_INTERVAL)
+                # startswith: GRBL 1.1 reports sub-coded states like
+                # Hold:0/Hold:1 and Door:0-3, never bare 'Hold'
+                if (self.status.state.startswith(('Run', 'Jog', 'Hold', 'Home', 'Door'))
+                        or time.monotonic() - self._last_write_ts < 1.0):
+                    interval = STATUS_POLL_INTERVAL
+                else:
+                    interval = STATUS_POLL_INTERVAL * 5
+                await asyncio.sleep(interval)
             except Exception as e:
                 if self.connected:
                     print(f'[GRBL] Poll error: {e}')
                 await asyncio.sleep(1)
 
+    def _resolve_pending(self, result: str):
+        """Resolve the in-flight send_command future (drops stale responses)."""
+        fut = self._pending
+        if fut and not fut.done():
+            fut.set_result(result)
+
     async def send_command(self, line: str, timeout: float = 10.0) -> str:
         """Send a G-code command and wait for ok/error response."""
         if not self.connected or not self.ser:
             return 'error:not_connected'
 
-        # Clear any pending responses
-        while not self.response_queue.empty():
-            try:
-                self.response_queue.get_nowait()
-            except:
-                break
+        # One command in flight at a time; response resolves a single-shot
+        # future set by _handle_line (stale responses are simply dropped)
+        async with self._cmd_lock:
+            fut = asyncio.get_event_loop().create_future()
+            self._pending = fut
 
-        # Send command
-        cmd = line.strip() + '\n'
-        self.ser.write(cmd.encode('utf-8'))
+            # Send command
+            cmd = line.strip() + '\n'
+            self._write(cmd.encode('utf-8'))
 
-        # Log to file
-        if self.logger:
-            self.logger.log_send(line.strip())
+            # Log to file
+            if self.logger:
+                self.logger.log_send(line.strip())
 
-        if self.broadcast_callback:
-            await self.broadcast_callback({'type': 'serial_write', 'line': line.strip()})
+            if self.broadcast_callback:
+                await self.broadcast_callback({'type': 'serial_write', 'line': line.strip()})
 
-        # Wait for response
-        try:
-            result_type, result = await asyncio.wait_for(
-                self.response_queue.get(),
-                timeout=timeout
-            )
-            # Re-read stored positions after G28.1/G30.1 or G10 (WCO change)
-            if line.strip().upper() in ('G28.1', 'G30.1') or line.strip().upper().startswith('G10'):
-                await asyncio.sleep(0.1)
-                await self.send_command('$#')
-            # After $ setting change: soft-reset GRBL, re-read all settings, broadcast
-            if line.strip().startswith('$') and '=' in line:
-                await asyncio.sleep(0.2)
-                self.send_realtime(b'\x18')  # Soft reset to flush EEPROM
-                await asyncio.sleep(1.0)
-                await self.send_command('$$')  # Re-read all settings from GRBL
-                if self.broadcast_callback:
-                    await self.broadcast_callback({'type': 'settings', 'settings': self.settings})
-            return result
-        except asyncio.TimeoutError:
-            return 'error:timeout'
+            # Wait for response
+            try:
+                result = await asyncio.wait_for(fut, timeout=timeout)
+            except asyncio.TimeoutError:
+                return 'error:timeout'
+            finally:
+                self._pending = None
+
+        # Follow-ups recurse into send_command, so run them outside the lock
+        # Re-read stored positions after G28.1/G30.1 or G10 (WCO change)
+        if line.strip().upper() in ('G28.1', 'G30.1') or line.strip().upper().startswith('G10'):
+            await asyncio.sleep(0.1)
+            await self.send_command('$#')
+        # After $ setting change: soft-reset GRBL, re-read all settings, broadcast
+        if line.strip().startswith('$') and '=' in line:
+            await asyncio.sleep(0.2)
+            self.send_realtime(b'\x18')  # Soft reset to flush EEPROM
+            await asyncio.sleep(1.0)
+            await self.send_command('$$')  # Re-read all settings from GRBL
+            if self.broadcast_callback:
+                await self.broadcast_callback({'type': 'settings', 'settings': self.settings})
+        return result
 
-    def send_stream_line(self, line: str) -> int:
-        """Send a G-code line for streaming (no wait). Returns bytes sent."""
-        cmd = line.strip() + '\n'
-        self.ser.write(cmd.encode('utf-8'))
+    def send_stream_line(self, line: str, encoded: Optional[bytes] = None) -> int:
+        """Send a G-code line for streaming (no wait). Returns bytes sent.
+
+        Pass pre-encoded wire bytes (line + newline) to skip strip/encode.
+        """
+        cmd = encoded if encoded is not None else (line.strip() + '\n').encode('utf-8')
+        self._write(cmd)
         if self.logger:
             self.logger.log_send(line.strip())
         return len(cmd)
@@ -588,7 +986,7 @@ class GrblConnection:
     def send_realtime(self, data: bytes):
         """Send real-time command (no newline, no response expected)."""
         if self.connected and self.ser:
-            self.ser.write(data)
+            self._write(data)
             # Log to file (except status polls to avoid spam)
             if self.logger and data != b'?':
                 self.logger.log_realtime(data[0] if data else 0)
@@ -598,7 +996,7 @@ class GrblConnection:
         if not self.connected or not self.ser:
             return
         cmd = line.strip() + '\n'
-        self.ser.write(cmd.encode('utf-8'))
+        self._write(cmd.encode('utf-8'))
         if self.logger:
             self.logger.log_send(line.strip())
         if self.broadcast_callback:
@@ -611,33 +1009,78 @@ class GrblConnection:
 class FileStreamer:
     """Handles G-code file streaming with recovery tracking."""
 
+    # Per-line dispatch flags, precomputed at load time
+    LINE_SEND = 0
+    LINE_SKIP = 1         # empty line or comment
+    LINE_TOOL_CHANGE = 2  # M6/M06
+
     def __init__(self, grbl: GrblConnection):
         self.grbl = grbl
         self.filename: str = ''
         self.lines: List[str] = []
+        self.lines_bytes: List[bytes] = []
+        self.line_flags: bytearray = bytearray()
         self.total_lines: int = 0
         self.current_line: int = 0
         self.running: bool = False
-        self.paused: bool = False
+        self._resume = asyncio.Event()  # set = running, cleared = paused
+        self._resume.set()
         self.stop_flag: bool = False
         self.broadcast_callback = None
         self.stream_task: Optional[asyncio.Task] = None
         self.recovery_file: str = 'recovery.txt'
+        self._last_recovery_save: float = 0.0
+        self._last_recovery_state: tuple = ()  # (filename, line) at last save
+        self._home_cmds: tuple = ('G53 G0 Z0', 'G53 G0 X-417.0 Y-2')  # rebuilt in start()
         self.air_cut: bool = False
         self.pause_every_n: int = 0   # user's chosen N (0 = no auto-pause)
         self.pause_countdown: int = 0  # lines remaining before next auto-pause
         self.macros = None  # set by CNCServer after init
         self.continue_event: asyncio.Event = asyncio.Event()
+        self._last_file_status: float = 0.0  # monotonic time of last progress broadcast
+        self._progress: Dict[str, Any] = {}  # reusable file_status frame (see load_file)
+        self._pct_per_line: float = 0.0
         self.dist_mode: str = 'G90'  # track absolute vs relative
         self.pgm_ended: bool = False
         self.z_margin: float = 2.0   # mm margin from machine limits
 
     def load_file(self, filename: str, content: str):
-        """Load G-code file content."""
+        """Load G-code file content.
+
+        Content arrives in memory over the WebSocket, so parsing is one
+        splitlines() pass (handles CRLF without a second strip). Lines are
+        kept 1:1 with the uploaded file — resume/analysis line numbers
+        must match what the UI shows.
+        """
         self.filename = filename
-        self.lines = [l.strip() for l in content.split('\n')]
+        self.lines = [l.strip() for l in content.splitlines()]
         self.total_lines = len(self.lines)
         self.current_line = 0
+
+        # Classify each line once so the streaming loop is a flag lookup
+        flags = bytearray(self.total_lines)
+        for i, s in enumerate(self.lines):
+            if not s or s.startswith(';') or s.startswith('('):
+                flags[i] = self.LINE_SKIP
+            elif self._is_tool_change(s):
+                flags[i] = self.LINE_TOOL_CHANGE
+        self.line_flags = flags
+
+        # Pre-encode wire bytes so untransformed lines skip strip/encode per send
+        self.lines_bytes = [(s + '\n').encode('utf-8') for s in self.lines]
+
+        # Reusable progress frame: the hot loop mutates current/percent/
+        # current_gcode in place (broadcast serializes immediately) and a
+        # multiply by the cached inverse replaces a divide per line
+        self._pct_per_line = 100.0 / self.total_lines if self.total_lines else 0.0
+        self._progress = {
+            'type': 'file_status',
+            'filename': filename,
+            'current': 0,
+            'total': self.total_lines,
+            'percent': 0.0,
+            'current_gcode': '',
+        }
         print(f'[Streamer] Loaded {filename}: {self.total_lines} lines')
 
     async def start(self, from_line: int = 0, skip_position_check: bool = False, air_cut: bool = False):
@@ -703,7 +1146,7 @@ class FileStreamer:
 
         self.current_line = max(0, from_line - 1)  # Convert 1-indexed UI line to 0-indexed array
         self.running = True
-        self.paused = False
+        self._resume.set()
         self.stop_flag = False
 
         # Clear stale state and set modal preamble when resuming mid-file
@@ -716,13 +1159,12 @@ class FileStreamer:
             if 'Hold' in self.grbl.status.state:
                 self.grbl.send_realtime(b'~')
                 await asyncio.sleep(0.5)
-            # Drain stale queues
-            for q in (self.grbl.response_queue, self.grbl.stream_queue):
-                while not q.empty():
-                    try:
-                        q.get_nowait()
-                    except:
-                        break
+            # Drain stale stream acks
+            while not self.grbl.stream_queue.empty():
+                try:
+                    self.grbl.stream_queue.get_nowait()
+                except:
+                    break
             # Set modal state — run through air cut filter
             preamble = self._build_preamble(from_line)
             if preamble:
@@ -734,6 +1176,10 @@ class FileStreamer:
                     elog(f'STREAMER: Preamble: {filtered}')
                     await self.grbl.send_command(filtered)
 
+        # Precompute the end-of-job return moves while settings are fresh
+        work_max_x = float(self.grbl.settings.get('$130', 834))
+        self._home_cmds = ('G53 G0 Z0', f'G53 G0 X{-work_max_x/2:.1f} Y-2')
+
         self.stream_task = asyncio.create_task(self._stream_loop())
         elog(f'STREAMER: Started {self.filename} from line {self.current_line}/{self.total_lines}')
         return True, 'Started'
@@ -947,7 +1393,7 @@ class FileStreamer:
 
     async def _stream_loop(self):
         """Main streaming loop using character-counting protocol."""
-        RX_BUF_SIZE = 128
+        RX_BUF_SIZE = GRBL_RX_BUFFER_SIZE
         buf_used = 0
         # sent_lines tracks (byte_count, gcode, line_number) for each unacknowledged line
         sent_lines = collections.deque()
@@ -968,22 +1414,25 @@ class FileStreamer:
                 if self.stop_flag:
                     break
 
-                if self.paused:
-                    await asyncio.sleep(0.1)
-                    continue
+                if not self._resume.is_set():
+                    # Blocks until resume()/stop() sets the event — no
+                    # 100 ms polling, and resume takes effect immediately
+                    await self._resume.wait()
+                    continue  # re-check stop_flag before sending
 
                 # --- SEND: fill GRBL buffer ---
                 while send_idx < self.total_lines and not self.stop_flag:
                     raw = self.lines[send_idx]
+                    flag = self.line_flags[send_idx]
 
                     # Skip empty lines and comments
-                    if not raw or raw.startswith(';') or raw.startswith('('):
+                    if flag == self.LINE_SKIP:
                         send_idx += 1
                         self.current_line = send_idx
                         continue
 
                     # Tool change: drain buffer, run macro, then continue
-                    if self._is_tool_change(raw) and self.macros:
+                    if flag == self.LINE_TOOL_CHANGE and self.macros:
                         buf_used_ref = [buf_used]
                         await self._drain_buffer(sent_lines, buf_used_ref)
                         buf_used = buf_used_ref[0]
@@ -1010,13 +1459,12 @@ class FileStreamer:
                         await self._wait_idle(max_polls=150)
                         # Refresh WCO after tool change (tool offset changes Z WCO)
                         await self.grbl.send_command('$#')
-                        # Drain both queues before re-entering streaming
-                        for q in (self.grbl.stream_queue, self.grbl.response_queue):
-                            while not q.empty():
-                                try:
-                                    q.get_nowait()
-                                except:
-                                    break
+                        # Drain stale stream acks before re-entering streaming
+                        while not self.grbl.stream_queue.empty():
+                            try:
+                                self.grbl.stream_queue.get_nowait()
+                            except:
+                                break
                         self.grbl.streaming = True
                         buf_used = 0
                         send_idx += 1
@@ -1070,10 +1518,12 @@ class FileStreamer:
                         line = clamped_line
                         elog(f'STREAMER: Z clamped line {send_idx + 1}')
 
-                    cmd_len = len(line.strip() + '\n')
+                    # Untransformed lines reuse the bytes encoded at load time
+                    encoded = self.lines_bytes[send_idx] if line is raw else None
+                    cmd_len = len(encoded) if encoded is not None else len(line.strip() + '\n')
                     if buf_used + cmd_len > RX_BUF_SIZE:
                         break  # buffer full, wait for responses
-                    nbytes = self.grbl.send_stream_line(line)
+                    nbytes = self.grbl.send_stream_line(line, encoded)
                     buf_used += nbytes
                     sent_lines.append((nbytes, line, send_idx))
                     send_idx += 1
@@ -1108,7 +1558,7 @@ class FileStreamer:
                             'type': 'grbl_buffer',
                             'commands': buf_cmds,
                             'bytes': buf_used,
-                            'max': 128,
+                            'max': GRBL_RX_BUFFER_SIZE,
                         })
 
                     if result.startswith('error'):
@@ -1125,16 +1575,19 @@ class FileStreamer:
                     if line_num % RECOVERY_SAVE_INTERVAL == 0:
                         self._save_recovery()
 
-                    # Broadcast progress (every line when stepping, every 5 lines otherwise)
-                    if self.broadcast_callback and (self.pause_every_n > 0 or line_num % 5 == 0):
-                        await self.broadcast_callback({
-                            'type': 'file_status',
-                            'filename': self.filename,
-                            'current': line_num + 1,
-                            'total': self.total_lines,
-                            'percent': (line_num + 1) / self.total_lines * 100,
-                            'current_gcode': gcode,
-                        })
+                    # Broadcast progress (every line when stepping, at most 10 Hz
+                    # otherwise, always on the final line)
+                    now = time.monotonic()
+                    if self.broadcast_callback and (
+                            self.pause_every_n > 0
+                            or now - self._last_file_status >= 0.1
+                            or line_num + 1 == self.total_lines):
+                        self._last_file_status = now
+                        progress = self._progress
+                        progress['current'] = line_num + 1
+                        progress['percent'] = (line_num + 1) * self._pct_per_line
+                        progress['current_gcode'] = gcode
+                        await self.broadcast_callback(progress)
 
                     # Auto-pause countdown
                     if self.pause_countdown > 0:
@@ -1151,7 +1604,7 @@ class FileStreamer:
                             buf_used -= nbytes_d
                             self.current_line = line_num_d + 1
                         await self._wait_idle(max_polls=50)
-                        self.paused = True
+                        self._resume.clear()
                         elog(f'STREAMER: Auto-paused at line {line_num + 1} (every {self.pause_every_n} lines)')
                         if self.broadcast_callback:
                             await self.broadcast_callback({
@@ -1169,7 +1622,7 @@ class FileStreamer:
             self.grbl.streaming = False
 
         # Done — wait for GRBL to finish executing buffered commands
-        self._save_recovery()
+        self._save_recovery(force=True)
         elog(f'STREAMER: Exited loop — current_line={self.current_line} total_lines={self.total_lines} stop_flag={self.stop_flag}')
         if not self.stop_flag:
             for _ in range(100):
@@ -1186,14 +1639,16 @@ class FileStreamer:
             # Stop spindle
             await self.grbl.send_command('M5')
 
-            # Go to Z top, then 12 o'clock (top center)
-            await self.grbl.send_command('G53 G0 Z0')
-            while self.grbl.status.state != 'Idle':
-                await asyncio.sleep(0.2)
-            work_max_x = float(self.grbl.settings.get('$130', 834))
-            await self.grbl.send_command(f'G53 G0 X{-work_max_x/2:.1f} Y-2')
-            while self.grbl.status.state != 'Idle':
-                await asyncio.sleep(0.2)
+            # Go to Z top, then 12 o'clock (top center). idle_event is
+            # set by _parse_status on the next Idle report, so these wake
+            # as soon as the move completes instead of on a 200 ms poll.
+            cmd_z, cmd_xy = self._home_cmds  # built in start() from $130
+            self.grbl.idle_event.clear()
+            await self.grbl.send_command(cmd_z)
+            await self.grbl.idle_event.wait()
+            self.grbl.idle_event.clear()
+            await self.grbl.send_command(cmd_xy)
+            await self.grbl.idle_event.wait()
 
             if self.broadcast_callback:
                 await self.broadcast_callback({
@@ -1202,39 +1657,72 @@ class FileStreamer:
                     'total': self.total_lines,
                 })
 
-    def _save_recovery(self):
-        """Save recovery information to file."""
+    def _save_recovery(self, force: bool = False):
+        """Save recovery information to file.
+
+        The blob is built on the event loop but written on the default
+        executor, atomically (tmp + os.replace) so a power cut mid-write
+        can't leave a torn recovery file. Throttled to 2 Hz and skipped
+        entirely while progress hasn't moved, unless forced (stop / end
+        of file).
+        """
+        now = time.monotonic()
+        if not force and now - self._last_recovery_save < 0.5:
+            return
+        state = (self.filename, self.current_line)
+        if not force and state == self._last_recovery_state:
+            return
+        self._last_recovery_save = now
+        self._last_recovery_state = state
+
+        blob = (
+            f'file={self.filename}\n'
+            f'total={self.total_lines}\n'
+            f'current={self.current_line}\n'
+            f'timestamp={time.strftime("%Y-%m-%d %H:%M:%S")}\n'
+        )
+        if self.grbl.connected:
+            blob += f'mpos_z={self.grbl.status.mpos["z"]:.3f}\n'
+
+        try:
+            asyncio.get_running_loop().run_in_executor(None, self._write_recovery, blob)
+        except RuntimeError:
+            self._write_recovery(blob)  # no running loop — write inline
+
+    def _write_recovery(self, blob: str):
+        """Atomic recovery-file write (runs on the executor)."""
         try:
-            with open(self.recovery_file, 'w') as f:
-                f.write(f'file={self.filename}\n')
-                f.write(f'total={self.total_lines}\n')
-                f.write(f'current={self.current_line}\n')
-                f.write(f'timestamp={time.strftime("%Y-%m-%d %H:%M:%S")}\n')
-                if self.grbl.connected:
-                    f.write(f'mpos_z={self.grbl.status.mpos["z"]:.3f}\n')
+            tmp = self.recovery_file + '.tmp'
+            with open(tmp, 'w') as f:
+                f.write(blob)
+            os.replace(tmp, self.recovery_file)
         except Exception as e:
             print(f'[Streamer] Recovery save failed: {e}')
 
+    @property
+    def paused(self) -> bool:
+        return not self._resume.is_set()
+
     def pause(self):
         """Pause streaming."""
-        self.paused = True
+        self._resume.clear()
         elog('STREAMER: Paused')
 
     def resume(self):
         """Resume streaming."""
-        self.paused = False
+        self._resume.set()
         elog('STREAMER: Resumed')
 
     def stop(self):
         """Stop streaming."""
         self.stop_flag = True
         self.running = False
-        self.paused = False
+        self._resume.set()  # wake the loop so it sees stop_flag
         self.air_cut = False
         if self.macros:
             self.macros.air_cut = False
         self.continue_event.set()  # unblock any waiting Z clamp
-        self._save_recovery()
+        self._save_recovery(force=True)
         elog('STREAMER: Stopped')
 
     def analyze(self) -> Dict[str, Any]:
@@ -1255,8 +1743,6 @@ def analyze_gcode(lines: List[str]) -> Dict[str, Any]:
     - cumulative_time: List of cumulative machining time (minutes) at each line
     - total_time: Total machining time in minutes
     """
-    import math
-
     max_feed = 0.0
     max_plunge = 0.0
     min_spindle = float('inf')
@@ -1279,55 +1765,44 @@ def analyze_gcode(lines: List[str]) -> Dict[str, Any]:
     cumulative_time = []
     total_time = 0.0
 
-    # Regex patterns
-    f_pattern = re.compile(r'F([\d.]+)', re.IGNORECASE)
-    x_pattern = re.compile(r'X([-\d.]+)', re.IGNORECASE)
-    y_pattern = re.compile(r'Y([-\d.]+)', re.IGNORECASE)
-    z_pattern = re.compile(r'Z([-\d.]+)', re.IGNORECASE)
-    s_pattern = re.compile(r'S([\d.]+)', re.IGNORECASE)
-
     for line_idx, line in enumerate(lines):
-        upper = line.upper().strip()
-
-        # Skip comments
-        if upper.startswith(';') or upper.startswith('('):
+        # Skip comment lines (load_file pre-strips whitespace; the
+        # tokenizer ignores inline comments)
+        if line[:1] in (';', '('):
             cumulative_time.append(total_time)
             continue
 
-        # Track modal G-code state
-        if 'G0' in upper or 'G00' in upper:
+        # One pass extracts every word value and the G/M codes on the line
+        words, gcodes, mcodes = _parse_gcode_line(line)
+
+        # Track modal G-code state by exact code — the old substring
+        # check ('G1' in line) also matched G10/G17/G18
+        if 0 in gcodes:
             is_g1_mode = False
-        if 'G1' in upper or 'G01' in upper:
+        if 1 in gcodes:
             is_g1_mode = True
 
-        # Extract F value if present
-        f_match = f_pattern.search(line)
-        if f_match:
-            current_f = float(f_match.group(1))
+        f_val = words.get('F')
+        if f_val is not None:
+            current_f = f_val
 
         # Extract target positions
-        new_x, new_y, new_z = pos_x, pos_y, pos_z
-        x_match = x_pattern.search(line)
-        y_match = y_pattern.search(line)
-        z_match = z_pattern.search(line)
-        if x_match:
-            new_x = float(x_match.group(1))
-        if y_match:
-            new_y = float(y_match.group(1))
-        if z_match:
+        new_x = words.get('X', pos_x)
+        new_y = words.get('Y', pos_y)
+        z_val = words.get('Z')
+        if z_val is not None:
             last_z = pos_z
-            new_z = float(z_match.group(1))
+            new_z = z_val
+        else:
+            new_z = pos_z
 
-        # Extract S value if present
-        s_match = s_pattern.search(line)
-        if s_match:
-            s_val = float(s_match.group(1))
-            if s_val > 0:
-                min_spindle = min(min_spindle, s_val)
-                max_spindle = max(max_spindle, s_val)
+        s_val = words.get('S')
+        if s_val is not None and s_val > 0:
+            min_spindle = min(min_spindle, s_val)
+            max_spindle = max(max_spindle, s_val)
 
         # Calculate time for G1 moves (G0 rapids are assumed instant for estimation)
-        if is_g1_mode or 'G1' in upper or 'G01' in upper:
+        if is_g1_mode:
             # Calculate 3D distance
             dx = new_x - pos_x
             dy = new_y - pos_y
@@ -1340,7 +1815,7 @@ def analyze_gcode(lines: List[str]) -> Dict[str, Any]:
                 total_time += move_time
 
             # Track max feed/plunge
-            if z_match and new_z < last_z:
+            if z_val is not None and new_z < last_z:
                 max_plunge = max(max_plunge, current_f)
             else:
                 max_feed = max(max_feed, current_f)
@@ -1355,7 +1830,7 @@ def analyze_gcode(lines: List[str]) -> Dict[str, Any]:
         cumulative_time.append(total_time)
 
         # Count tool changes
-        if 'M6' in upper or 'M06' in upper:
+        if 6 in mcodes:
             tool_changes += 1
             tool_change_lines.append(line_idx + 1)
 
@@ -1370,15 +1845,15 @@ def analyze_gcode(lines: List[str]) -> Dict[str, Any]:
                 for ln in tool_change_lines]
     tc_times.append(total_time)  # End of file as final "tool change"
 
-    tc_idx = 0
-    for i, ct in enumerate(cumulative_time):
-        line_num = i + 1
-        # Move to next tool change if we've passed the current one
-        while tc_idx < len(tool_change_lines) and line_num > tool_change_lines[tc_idx]:
-            tc_idx += 1
-        # Time remaining to next tool change
-        next_tc_time = tc_times[tc_idx] if tc_idx < len(tc_times) else total_time
-        time_to_next_tc.append(next_tc_time - ct)
+    # Fill per segment: lines up to and including tool change k all share
+    # deadline tc_times[k], so each segment is one slice comprehension
+    # instead of per-line index bookkeeping.
+    seg_start = 0
+    for k, tc_time in enumerate(tc_times):
+        seg_end = tool_change_lines[k] if k < len(tool_change_lines) else len(cumulative_time)
+        seg_end = min(seg_end, len(cumulative_time))
+        time_to_next_tc.extend(tc_time - ct for ct in cumulative_time[seg_start:seg_end])
+        seg_start = seg_end
 
     return {
         'max_feed': max_feed,
@@ -1401,25 +1876,63 @@ def analyze_gcode(lines: List[str]) -> Dict[str, Any]:
 # WEBSOCKET SERVER
 # ============================================================
 
+class ClientSendQueue:
+    """Outgoing frame queue for one WebSocket client.
+
+    broadcast() enqueues here without awaiting the send, so one slow
+    client can't stall the serial read path. Status frames are coalesced
+    (only the newest is kept) and the oldest frame is dropped on overflow.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.frames: collections.deque = collections.deque()
+        self.maxsize = maxsize
+        self._ready = asyncio.Event()
+
+    def put(self, msg_type: str, data: str):
+        """Queue a serialized frame (drops stale status / oldest on overflow)."""
+        if msg_type == 'status':
+            # Overwrite-latest: drop any status frame still queued
+            for i, (t, _) in enumerate(self.frames):
+                if t == 'status':
+                    del self.frames[i]
+                    break
+        if len(self.frames) >= self.maxsize:
+            self.frames.popleft()
+        self.frames.append((msg_type, data))
+        self._ready.set()
+
+    async def get(self) -> str:
+        """Wait for and return the next serialized frame."""
+        while not self.frames:
+            self._ready.clear()
+            await self._ready.wait()
+        return self.frames.popleft()[1]
+
+
 class GrblServer:
     """WebSocket server for CNC control."""
 
     def __init__(self, http_port: int, serial_port: str):
         self.http_port = http_port
-        self.ws_port = http_port + 1  # WebSocket on separate port
         self.serial_port = serial_port
         self.logger = SerialLogger()
         self.grbl = GrblConnection(logger=self.logger)
         self.streamer = FileStreamer(self.grbl)
         self.macros = MacroEngine(self.grbl)
-        self.clients: Set = set()
-        self.html_content: str = ''
+        self.clients: Dict = {}  # websocket -> ClientSendQueue
+        self._status_frame: Optional[str] = None  # cached serialized status broadcast
+        self._html_gz: tuple = ('', b'')  # (etag, gzipped jog.html body)
+        self._ports_cache: tuple = (0.0, None)  # (monotonic ts, [port names])
+        self._macro_list_cache: tuple = (None, '')  # (macros dir mtime, serialized frame)
+        self._stopped = asyncio.Event()  # set by stop() to let start() unwind cleanly
 
         # Set up broadcast callbacks
         self.grbl.broadcast_callback = self.broadcast
         self.streamer.broadcast_callback = self.broadcast
         self.macros.broadcast_callback = self.broadcast
         self.macros.notify_callback = self.send_notification
+        self.macros.has_clients = lambda: bool(self.clients)
         self.macros.streamer = self.streamer  # Give macros access to loaded G-code
         self.streamer.macros = self.macros   # Give streamer access to tool change macro
 
@@ -1431,20 +1944,48 @@ class GrblServer:
         """Broadcast message to all connected clients."""
         if not self.clients:
             return
-        data = json.dumps(msg)
-        await asyncio.gather(
-            *[client.send(data) for client in self.clients],
-            return_exceptions=True
-        )
+        msg_type = msg.get('type', '')
+        if msg_type == 'status':
+            # Polled at 10 Hz but usually identical while idle — reuse
+            # the cached serialization until the parser marks it dirty
+            if self.grbl.status_dirty or self._status_frame is None:
+                self._status_frame = _dumps(msg)
+                self.grbl.status_dirty = False
+            data = self._status_frame
+        else:
+            data = _dumps(msg)
+        for queue in self.clients.values():
+            queue.put(msg_type, data)
+
+    # How long one send may stall before a client is declared dead. A
+    # healthy browser on the shop LAN acks in milliseconds; a wedged TCP
+    # receiver would otherwise hold its queue until kernel buffers drain.
+    CLIENT_SEND_TIMEOUT = 2.0
+
+    async def _client_writer(self, websocket, queue: 'ClientSendQueue'):
+        """Drain one client's send queue onto its WebSocket."""
+        while True:
+            data = await queue.get()
+            try:
+                await asyncio.wait_for(websocket.send(data), self.CLIENT_SEND_TIMEOUT)
+            except asyncio.TimeoutError:
+                elog('WS: client send stalled — dropping client')
+                self.clients.pop(websocket, None)
+                await websocket.close()
+                return
+            except websockets.exceptions.ConnectionClosed:
+                return  # handle_client's finally does the cleanup
 
     async def handle_client(self, websocket):
         """Handle WebSocket client connection."""
-        self.clients.add(websocket)
+        queue = ClientSendQueue()
+        self.clients[websocket] = queue
+        writer = asyncio.create_task(self._client_writer(websocket, queue))
         print(f'[WS] Client connected ({len(self.clients)} total)')
 
         # Send current connection status to new client
         if self.grbl.connected:
-            await websocket.send(json.dumps({
+            await websocket.send(_dumps({
                 'type': 'connected',
                 'port': self.grbl.port
             }))
@@ -1452,16 +1993,17 @@ class GrblServer:
         try:
             async for message in websocket:
                 try:
-                    msg = json.loads(message)
+                    msg = _loads(message)
                     await self.handle_message(websocket, msg)
                 except json.JSONDecodeError:
-                    await websocket.send(json.dumps({'type': 'error', 'message': 'Invalid JSON'}))
+                    await websocket.send(_FRAME_BAD_JSON)
                 except Exception as e:
                     elog(f'WS HANDLER ERROR: {e}')
                     import traceback
                     elog(traceback.format_exc())
         finally:
-            self.clients.discard(websocket)
+            writer.cancel()
+            self.clients.pop(websocket, None)
             print(f'[WS] Client disconnected ({len(self.clients)} total)')
 
     async def _soft_reset_and_restore_wco(self, log_prefix: str, saved_wco: dict = None):
@@ -1489,358 +2031,432 @@ class GrblServer:
             details = {k: v for k, v in msg.items() if k != 'type' and k != 'content'}
             elog(f'UI: {msg_type} {details if details else ""}')
 
-        if msg_type == 'connect':
-            port = msg.get('port', self.serial_port)
-            success = await self.grbl.connect(port)
-            await ws.send(json.dumps({
-                'type': 'connected' if success else 'error',
-                'port': port,
-            }))
-
-        elif msg_type == 'disconnect':
-            await self.grbl.disconnect()
-            await ws.send(json.dumps({'type': 'disconnected'}))
-
-        elif msg_type == 'list_ports':
-            ports = [p.device for p in serial.tools.list_ports.comports()]
-            await ws.send(json.dumps({'type': 'ports', 'ports': ports}))
+        handler = self._MSG_HANDLERS.get(msg_type)
+        if handler:
+            await handler(self, ws, msg)
+
+    async def _on_connect(self, ws, msg: Dict[str, Any]):
+        port = msg.get('port', self.serial_port)
+        success = await self.grbl.connect(port)
+        await ws.send(_dumps({
+            'type': 'connected' if success else 'error',
+            'port': port,
+        }))
+
+    async def _on_disconnect(self, ws, msg: Dict[str, Any]):
+        await self.grbl.disconnect()
+        await ws.send(_FRAME_DISCONNECTED)
+
+    @staticmethod
+    def _scan_ports() -> List[str]:
+        return [p.device for p in serial.tools.list_ports.comports()]
+
+    async def _on_list_ports(self, ws, msg: Dict[str, Any]):
+        # comports() walks /sys/class/tty — run it off the loop and cache
+        # for 2 s so a click-happy user doesn't trigger repeated scans
+        now = time.monotonic()
+        ts, ports = self._ports_cache
+        if ports is None or now - ts > 2.0:
+            ports = await asyncio.to_thread(self._scan_ports)
+            self._ports_cache = (now, ports)
+        await ws.send(_dumps({'type': 'ports', 'ports': ports}))
+
+    async def _on_gcode(self, ws, msg: Dict[str, Any]):
+        line = msg.get('line', '')
+        nowait = msg.get('nowait', False)
+        if nowait:
+            await self.grbl.send_nowait(line)
+        else:
+            result = await self.grbl.send_command(line)
+            await ws.send(_dumps({'type': 'response', 'to': line, 'result': result}))
+
+    async def _on_realtime(self, ws, msg: Dict[str, Any]):
+        byte = msg.get('byte', 0)
+        if isinstance(byte, int):
+            names = {0x18:'Reset',0x21:'FeedHold',0x7E:'CycleStart',0x90:'FeedOv100%',0x91:'FeedOv+10%',0x92:'FeedOv-10%',0x93:'FeedOv+1%',0x94:'FeedOv-1%',0x95:'RapidOv100%',0x96:'RapidOv50%',0x97:'RapidOv25%',0x99:'SpindleOv100%',0x9A:'SpindleOv+10%',0x9B:'SpindleOv-10%',0x9C:'SpindleOv+1%',0x9D:'SpindleOv-1%',0x9E:'SpindleToggle'}
+            name = names.get(byte, f'0x{byte:02X}')
+            elog(f'Realtime: {name}')
+            # No per-byte reply or console broadcast: override/jog bytes
+            # arrive in bursts, and the effect shows up in the next
+            # status broadcast anyway (Ov:/state fields)
+            self.grbl.send_realtime(bytes([byte]))
+
+    async def _on_unlock(self, ws, msg: Dict[str, Any]):
+        await self.grbl.send_command('$X')
 
-        elif msg_type == 'gcode':
-            line = msg.get('line', '')
-            nowait = msg.get('nowait', False)
-            if nowait:
-                await self.grbl.send_nowait(line)
-            else:
-                result = await self.grbl.send_command(line)
-                await ws.send(json.dumps({'type': 'response', 'to': line, 'result': result}))
-
-        elif msg_type == 'realtime':
-            byte = msg.get('byte', 0)
-            if isinstance(byte, int):
-                names = {0x18:'Reset',0x21:'FeedHold',0x7E:'CycleStart',0x90:'FeedOv100%',0x91:'FeedOv+10%',0x92:'FeedOv-10%',0x93:'FeedOv+1%',0x94:'FeedOv-1%',0x95:'RapidOv100%',0x96:'RapidOv50%',0x97:'RapidOv25%',0x99:'SpindleOv100%',0x9A:'SpindleOv+10%',0x9B:'SpindleOv-10%',0x9C:'SpindleOv+1%',0x9D:'SpindleOv-1%',0x9E:'SpindleToggle'}
-                name = names.get(byte, f'0x{byte:02X}')
-                elog(f'Realtime: {name}')
-                if self.broadcast:
-                    await self.broadcast({'type': 'macro_log', 'name': '', 'message': f'Realtime: {name}'})
-                self.grbl.send_realtime(bytes([byte]))
-
-        elif msg_type == 'unlock':
-            await self.grbl.send_command('$X')
-
-        elif msg_type == 'reset':
-            self.macros.cancel()
-            await self._soft_reset_and_restore_wco('RESET')
-
-        elif msg_type == 'feed_hold':
-            self.grbl.send_realtime(b'!')
-
-        elif msg_type == 'cycle_start':
-            self.grbl.send_realtime(b'~')
-
-        elif msg_type == 'settings':
-            await ws.send(json.dumps({'type': 'settings', 'settings': self.grbl.settings}))
-
-        elif msg_type == 'file_upload':
-            filename = msg.get('filename', 'unknown.nc')
-            content = msg.get('content', '')
-            self.streamer.load_file(filename, content)
-            analysis = self.streamer.analyze()
-            await ws.send(json.dumps({
-                'type': 'file_status',
-                'filename': filename,
-                'current': 0,
-                'total': self.streamer.total_lines,
-                'percent': 0,
-                'analysis': analysis,
-            }))
+    async def _on_reset(self, ws, msg: Dict[str, Any]):
+        self.macros.cancel()
+        await self._soft_reset_and_restore_wco('RESET')
+
+    async def _on_feed_hold(self, ws, msg: Dict[str, Any]):
+        self.grbl.send_realtime(b'!')
+
+    async def _on_cycle_start(self, ws, msg: Dict[str, Any]):
+        self.grbl.send_realtime(b'~')
+
+    async def _on_settings(self, ws, msg: Dict[str, Any]):
+        await ws.send(_dumps({'type': 'settings', 'settings': self.grbl.settings}))
+
+    async def _on_file_upload(self, ws, msg: Dict[str, Any]):
+        filename = msg.get('filename', 'unknown.nc')
+        content = msg.get('content', '')
+        self.streamer.load_file(filename, content)
+        analysis = self.streamer.analyze()
+        await ws.send(_dumps({
+            'type': 'file_status',
+            'filename': filename,
+            'current': 0,
+            'total': self.streamer.total_lines,
+            'percent': 0,
+            'analysis': analysis,
+        }))
+
+    async def _on_file_start(self, ws, msg: Dict[str, Any]):
+        from_line = msg.get('from_line', 0)
+        skip_check = msg.get('skip_position_check', False)
+        # Skip position check if resuming from middle of file
+        if from_line > 1:
+            skip_check = True
+        air_cut = msg.get('air_cut', False)
+        success, error_msg = await self.streamer.start(from_line, skip_position_check=skip_check, air_cut=air_cut)
+        if not success:
+            elog(f'FILE START ERROR: {error_msg}')
+            await ws.send(_dumps({'type': 'file_start_error', 'error': error_msg}))
+
+    async def _on_file_set_pause_n(self, ws, msg: Dict[str, Any]):
+        n = msg.get('n', 0)
+        self.streamer.pause_every_n = n
+        self.streamer.pause_countdown = n
+        elog(f'STREAMER: pause_every_n set to {n}, countdown={n}')
+
+    async def _on_file_pause(self, ws, msg: Dict[str, Any]):
+        self.streamer.pause()
+
+    async def _on_file_resume(self, ws, msg: Dict[str, Any]):
+        self.streamer.resume()
+
+    async def _on_file_stop(self, ws, msg: Dict[str, Any]):
+        # Save WCO immediately
+        saved_wco = dict(self.grbl.wco_cached)
+        self.streamer.stop()
+        # Feed hold stops motion
+        self.grbl.send_realtime(b'!')
+        for _ in range(50):
+            if self.grbl.status.state in ('Hold:0',):
+                break
+            await asyncio.sleep(0.1)
+        # Soft reset to flush GRBL buffer
+        self.grbl.send_realtime(b'\x18')
+        await asyncio.sleep(1.5)
+        await self.grbl.send_command('$X')
+        await asyncio.sleep(0.3)
+        # Restore coordinates from saved WCO
+        mpos = self.grbl.status.mpos
+        await self.grbl.send_command(
+            f'G10 L20 P1 X{mpos["x"] - saved_wco["x"]:.3f} '
+            f'Y{mpos["y"] - saved_wco["y"]:.3f} '
+            f'Z{mpos["z"] - saved_wco["z"]:.3f} '
+            f'A{mpos["a"] - saved_wco["a"]:.3f}'
+        )
+        # Drain stale stream acks
+        while not self.grbl.stream_queue.empty():
+            try:
+                self.grbl.stream_queue.get_nowait()
+            except:
+                break
+        self.grbl.streaming = False
+        # Spindle off and raise Z to top
+        await self.grbl.send_command('M5')
+        await self.grbl.send_command('G53 G0 Z-2')
+        elog(f'STREAMER: Stop complete (WCO restored X{saved_wco["x"]:.3f} Y{saved_wco["y"]:.3f} Z{saved_wco["z"]:.3f})')
+
+    async def _on_home(self, ws, msg: Dict[str, Any]):
+        axes = msg.get('axes', 'ZXY')
+        reset_a = msg.get('reset_a', axes == 'ZXY')
+        elog(f'HOMING requested: axes={axes}')
+        if not self.macros.try_start(self.macros.run_homing(axes, reset_a)):
+            elog('HOMING rejected: macro already running')
+            await ws.send(_dumps({'type': 'error', 'message': 'Macro already running'}))
+
+    async def _on_macro_run(self, ws, msg: Dict[str, Any]):
+        if self.macros.running:
+            elog('MACRO rejected: already running')
+            await ws.send(_dumps({'type': 'error', 'message': 'Macro already running'}))
+            return
+        if self.streamer.running:
+            elog('MACRO rejected: file is streaming')
+            await ws.send(_dumps({'type': 'error', 'message': 'Cannot run macro — file is streaming. Stop the file first.'}))
+            return
+        name = msg.get('name', '')
+        # Map button names to macro file names
+        name_map = {
+            'set_z': 'tool_measure',
+            'tool_change': 'tool_change',
+        }
+        macro_name = name_map.get(name, name)
+        # Pass all message params (except type and name) to macro
+        params = {k: v for k, v in msg.items() if k not in ('type', 'name')}
+        if 'tool_diameter' not in params:
+            params['tool_diameter'] = 6.35  # Default to 1/4"
+        elog(f'MACRO requested: {macro_name} params={params}')
+        if not self.macros.try_start(self.macros.run_macro(macro_name, **params)):
+            elog('MACRO rejected: task slot busy')
+            await ws.send(_dumps({'type': 'error', 'message': 'Macro already running'}))
+
+    async def _on_macro_continue(self, ws, msg: Dict[str, Any]):
+        self.macros.continue_macro()
+        self.streamer.continue_stream()
+
+    async def _on_macro_skip(self, ws, msg: Dict[str, Any]):
+        self.macros.skip_flag = True
+        self.macros.continue_macro()
+        elog('MACRO: Skip requested')
+
+    async def _on_macro_cancel(self, ws, msg: Dict[str, Any]):
+        self.macros.cancel()
+
+    async def _on_macro_list(self, ws, msg: Dict[str, Any]):
+        # Return list of available macros grouped by category. The list
+        # depends only on filenames, so the serialized frame is cached
+        # against the directory mtime — UI refreshes skip the glob
+        macros_dir = Path(__file__).parent / 'macros'
+        try:
+            dir_mtime = macros_dir.stat().st_mtime
+        except OSError:
+            dir_mtime = -1.0
+        if dir_mtime == self._macro_list_cache[0]:
+            await ws.send(self._macro_list_cache[1])
+            return
+        macros = []
+
+        # Add config.py as first item
+        config_path = Path(__file__).parent / 'config.py'
+        if config_path.exists():
+            macros.append({
+                'name': '_config',
+                'label': 'Config',
+                'category': '0_Config'  # 0_ prefix to sort first
+            })
 
-        elif msg_type == 'file_start':
-            from_line = msg.get('from_line', 0)
-            skip_check = msg.get('skip_position_check', False)
-            # Skip position check if resuming from middle of file
-            if from_line > 1:
-                skip_check = True
-            air_cut = msg.get('air_cut', False)
-            success, error_msg = await self.streamer.start(from_line, skip_position_check=skip_check, air_cut=air_cut)
-            if not success:
-                elog(f'FILE START ERROR: {error_msg}')
-                await ws.send(json.dumps({'type': 'file_start_error', 'error': error_msg}))
-
-        elif msg_type == 'file_set_pause_n':
-            n = msg.get('n', 0)
-            self.streamer.pause_every_n = n
-            self.streamer.pause_countdown = n
-            elog(f'STREAMER: pause_every_n set to {n}, countdown={n}')
-
-        elif msg_type == 'file_pause':
-            self.streamer.pause()
-
-        elif msg_type == 'file_resume':
-            self.streamer.resume()
-
-        elif msg_type == 'file_stop':
-            # Save WCO immediately
-            saved_wco = dict(self.grbl.wco_cached)
-            self.streamer.stop()
-            # Feed hold stops motion
-            self.grbl.send_realtime(b'!')
-            for _ in range(50):
-                if self.grbl.status.state in ('Hold:0',):
-                    break
-                await asyncio.sleep(0.1)
-            # Soft reset to flush GRBL buffer
-            self.grbl.send_realtime(b'\x18')
-            await asyncio.sleep(1.5)
-            await self.grbl.send_command('$X')
-            await asyncio.sleep(0.3)
-            # Restore coordinates from saved WCO
-            mpos = self.grbl.status.mpos
-            await self.grbl.send_command(
-                f'G10 L20 P1 X{mpos["x"] - saved_wco["x"]:.3f} '
-                f'Y{mpos["y"] - saved_wco["y"]:.3f} '
-                f'Z{mpos["z"] - saved_wco["z"]:.3f} '
-                f'A{mpos["a"] - saved_wco["a"]:.3f}'
-            )
-            # Drain software queues
-            for q in (self.grbl.stream_queue, self.grbl.response_queue):
-                while not q.empty():
-                    try:
-                        q.get_nowait()
-                    except:
-                        break
-            self.grbl.streaming = False
-            # Spindle off and raise Z to top
-            await self.grbl.send_command('M5')
-            await self.grbl.send_command('G53 G0 Z-2')
-            elog(f'STREAMER: Stop complete (WCO restored X{saved_wco["x"]:.3f} Y{saved_wco["y"]:.3f} Z{saved_wco["z"]:.3f})')
-
-        elif msg_type == 'home':
-            axes = msg.get('axes', 'ZXY')
-            reset_a = msg.get('reset_a', axes == 'ZXY')
-            elog(f'HOMING requested: axes={axes}')
-            asyncio.create_task(self.macros.run_homing(axes, reset_a))
-
-        elif msg_type == 'macro_run':
-            if self.macros.running:
-                elog('MACRO rejected: already running')
-                await ws.send(json.dumps({'type': 'error', 'message': 'Macro already running'}))
-                return
-            if self.streamer.running:
-                elog('MACRO rejected: file is streaming')
-                await ws.send(json.dumps({'type': 'error', 'message': 'Cannot run macro — file is streaming. Stop the file first.'}))
-                return
-            name = msg.get('name', '')
-            # Map button names to macro file names
-            name_map = {
-                'set_z': 'tool_measure',
-                'tool_change': 'tool_change',
-            }
-            macro_name = name_map.get(name, name)
-            # Pass all message params (except type and name) to macro
-            params = {k: v for k, v in msg.items() if k not in ('type', 'name')}
-            if 'tool_diameter' not in params:
-                params['tool_diameter'] = 6.35  # Default to 1/4"
-            elog(f'MACRO requested: {macro_name} params={params}')
-            asyncio.create_task(self.macros.run_macro(macro_name, **params))
-
-        elif msg_type == 'macro_continue':
-            self.macros.continue_macro()
-            self.streamer.continue_stream()
-
-        elif msg_type == 'macro_skip':
-            self.macros.skip_flag = True
-            self.macros.continue_macro()
-            elog('MACRO: Skip requested')
-
-        elif msg_type == 'macro_cancel':
-            self.macros.cancel()
-
-        elif msg_type == 'macro_list':
-            # Return list of available macros grouped by category
-            macros_dir = Path(__file__).parent / 'macros'
-            macros = []
-
-            # Add config.py as first item
-            config_path = Path(__file__).parent / 'config.py'
-            if config_path.exists():
+        if macros_dir.exists():
+            for f in sorted(macros_dir.glob('*.py')):
+                name = f.stem
+                # Convert filename to label: probe_z -> Probe:Z
+                parts = name.split('_', 1)
+                if len(parts) == 2:
+                    category = parts[0].capitalize()
+                    label = parts[1].replace('_', ' ').title().replace(' ', '')
+                    display_label = f'{category}:{label}'
+                else:
+                    display_label = name.capitalize()
                 macros.append({
-                    'name': '_config',
-                    'label': 'Config',
-                    'category': '0_Config'  # 0_ prefix to sort first
+                    'name': name,
+                    'label': display_label,
+                    'category': parts[0].capitalize() if len(parts) == 2 else 'Other'
                 })
-
-            if macros_dir.exists():
-                for f in sorted(macros_dir.glob('*.py')):
-                    name = f.stem
-                    # Convert filename to label: probe_z -> Probe:Z
-                    parts = name.split('_', 1)
-                    if len(parts) == 2:
-                        category = parts[0].capitalize()
-                        label = parts[1].replace('_', ' ').title().replace(' ', '')
-                        display_label = f'{category}:{label}'
-                    else:
-                        display_label = name.capitalize()
-                    macros.append({
-                        'name': name,
-                        'label': display_label,
-                        'category': parts[0].capitalize() if len(parts) == 2 else 'Other'
-                    })
-            await ws.send(json.dumps({'type': 'macro_list', 'macros': macros}))
-
-        elif msg_type == 'macro_load':
-            name = msg.get('name', '')
-            # Special handling for config.py
-            if name == '_config':
-                macro_path = Path(__file__).parent / 'config.py'
-            else:
-                macro_path = Path(__file__).parent / 'macros' / f'{name}.py'
-            if macro_path.exists():
-                code = macro_path.read_text()
-                await ws.send(json.dumps({'type': 'macro_content', 'name': name, 'code': code}))
-            else:
-                await ws.send(json.dumps({'type': 'macro_content', 'name': name, 'code': '', 'error': 'File not found'}))
-
-        elif msg_type == 'macro_save':
-            name = msg.get('name', '')
-            code = msg.get('code', '')
-            # Special handling for config.py
-            if name == '_config':
-                macro_path = Path(__file__).parent / 'config.py'
-                display_name = 'config'
-            else:
-                macro_path = Path(__file__).parent / 'macros' / f'{name}.py'
-                display_name = name
-            macro_path.write_text(code)
-            await self.broadcast({'type': 'macro_log', 'name': name, 'message': f'Saved {display_name}.py'})
-
-        elif msg_type == 'fixture_list':
-            # Return current fixtures list
-            await ws.send(json.dumps({
-                'type': 'fixtures',
-                'fixtures': self.macros.fixtures
-            }))
-
-        elif msg_type == 'fixture_remove':
-            # Remove fixture by index
-            index = msg.get('index', -1)
-            if 0 <= index < len(self.macros.fixtures):
-                removed = self.macros.fixtures.pop(index)
-                await self.broadcast({
-                    'type': 'fixtures',
-                    'fixtures': self.macros.fixtures
-                })
-                await self.broadcast({
-                    'type': 'macro_log',
-                    'name': 'fixtures',
-                    'message': f'Removed fixture #{index + 1} at X{removed["x"]:.1f} Y{removed["y"]:.1f}'
-                })
-
-        elif msg_type == 'fixture_clear':
-            # Clear all fixtures
-            self.macros.fixtures.clear()
+        frame = _dumps({'type': 'macro_list', 'macros': macros})
+        self._macro_list_cache = (dir_mtime, frame)
+        await ws.send(frame)
+
+    async def _on_macro_load(self, ws, msg: Dict[str, Any]):
+        name = msg.get('name', '')
+        # Special handling for config.py
+        if name == '_config':
+            macro_path = Path(__file__).parent / 'config.py'
+        else:
+            macro_path = Path(__file__).parent / 'macros' / f'{name}.py'
+        if macro_path.exists():
+            code = macro_path.read_text()
+            await ws.send(_dumps({'type': 'macro_content', 'name': name, 'code': code}))
+        else:
+            await ws.send(_dumps({'type': 'macro_content', 'name': name, 'code': '', 'error': 'File not found'}))
+
+    async def _on_macro_save(self, ws, msg: Dict[str, Any]):
+        name = msg.get('name', '')
+        code = msg.get('code', '')
+        # Special handling for config.py
+        if name == '_config':
+            macro_path = Path(__file__).parent / 'config.py'
+            display_name = 'config'
+        else:
+            macro_path = Path(__file__).parent / 'macros' / f'{name}.py'
+            display_name = name
+        macro_path.write_text(code)
+        await self.broadcast({'type': 'macro_log', 'name': name, 'message': f'Saved {display_name}.py'})
+
+    async def _on_fixture_list(self, ws, msg: Dict[str, Any]):
+        # Return current fixtures list
+        await ws.send(_dumps({
+            'type': 'fixtures',
+            'fixtures': self.macros.fixtures
+        }))
+
+    async def _on_fixture_remove(self, ws, msg: Dict[str, Any]):
+        # Remove fixture by index
+        index = msg.get('index', -1)
+        if 0 <= index < len(self.macros.fixtures):
+            removed = self.macros.fixtures.pop(index)
             await self.broadcast({
                 'type': 'fixtures',
-                'fixtures': []
+                'fixtures': self.macros.fixtures
             })
             await self.broadcast({
                 'type': 'macro_log',
                 'name': 'fixtures',
-                'message': 'All fixtures cleared'
+                'message': f'Removed fixture #{index + 1} at X{removed["x"]:.1f} Y{removed["y"]:.1f}'
             })
 
-        elif msg_type == 'check_collisions':
-            # Check loaded G-code against fixtures
-            collisions = self.macros.check_collisions()
-            await ws.send(json.dumps({
-                'type': 'collision_check',
-                'collisions': collisions,
-                'count': len(collisions)
-            }))
-            if collisions:
-                await self.broadcast({
-                    'type': 'macro_log',
-                    'name': 'collision_check',
-                    'message': f'WARNING: {len(collisions)} potential fixture collisions detected!'
-                })
-
-        elif msg_type == 'client_log':
-            elog(f'HTML: {msg.get("message", "")}')
-
-    def load_html(self):
-        """Load jog.html from same directory as script."""
-        script_dir = Path(__file__).parent
-        html_path = script_dir / 'jog.html'
-        if html_path.exists():
-            # Update WebSocket URL in HTML to use ws_port
-            content = html_path.read_text()
-            # Replace the getWsUrl function to use the correct WS port
-            self.html_content = content.replace(
-                "return 'ws://' + window.location.host + '/ws';",
-                f"return 'ws://' + window.location.hostname + ':{self.ws_port}';"
-            )
-            print(f'[Server] Loaded {html_path}')
-        else:
-            self.html_content = '<html><body><h1>jog.html not found</h1></body></html>'
-            print(f'[Server] WARNING: {html_path} not found')
-
-    def run_http_server(self):
-        """Run HTTP server in a thread."""
-        script_dir = Path(__file__).parent
-
-        class Handler(http.server.SimpleHTTPRequestHandler):
-            def __init__(handler_self, *args, **kwargs):
-                super().__init__(*args, directory=str(script_dir), **kwargs)
-
-            def do_GET(handler_self):
-                if handler_self.path == '/' or handler_self.path == '/index.html':
-                    # Re-read jog.html on every request so changes take effect without restart
-                    html_path = Path(__file__).parent / 'jog.html'
-                    content = html_path.read_text() if html_path.exists() else '<h1>jog.html not found</h1>'
-                    content = content.replace(
-                        "return 'ws://' + window.location.host + '/ws';",
-                        f"return 'ws://' + window.location.hostname + ':{self.ws_port}';"
-                    )
-                    handler_self.send_response(200)
-                    handler_self.send_header('Content-type', 'text/html')
-                    handler_self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
-                    handler_self.send_header('Pragma', 'no-cache')
-                    handler_self.send_header('Expires', '0')
-                    handler_self.end_headers()
-                    handler_self.wfile.write(content.encode())
-                else:
-                    super().do_GET()
+    async def _on_fixture_clear(self, ws, msg: Dict[str, Any]):
+        # Clear all fixtures
+        self.macros.fixtures.clear()
+        await self.broadcast({
+            'type': 'fixtures',
+            'fixtures': []
+        })
+        await self.broadcast({
+            'type': 'macro_log',
+            'name': 'fixtures',
+            'message': 'All fixtures cleared'
+        })
+
+    async def _on_check_collisions(self, ws, msg: Dict[str, Any]):
+        # Check loaded G-code against fixtures
+        collisions = self.macros.check_collisions()
+        await ws.send(_dumps({
+            'type': 'collision_check',
+            'collisions': collisions,
+            'count': len(collisions)
+        }))
+        if collisions:
+            await self.broadcast({
+                'type': 'macro_log',
+                'name': 'collision_check',
+                'message': f'WARNING: {len(collisions)} potential fixture collisions detected!'
+            })
 
-            def log_message(handler_self, format, *args):
-                pass  # Suppress HTTP logs
+    async def _on_client_log(self, ws, msg: Dict[str, Any]):
+        elog(f'HTML: {msg.get("message", "")}')
+
+    _MSG_HANDLERS = {
+        'connect': _on_connect,
+        'disconnect': _on_disconnect,
+        'list_ports': _on_list_ports,
+        'gcode': _on_gcode,
+        'realtime': _on_realtime,
+        'unlock': _on_unlock,
+        'reset': _on_reset,
+        'feed_hold': _on_feed_hold,
+        'cycle_start': _on_cycle_start,
+        'settings': _on_settings,
+        'file_upload': _on_file_upload,
+        'file_start': _on_file_start,
+        'file_set_pause_n': _on_file_set_pause_n,
+        'file_pause': _on_file_pause,
+        'file_resume': _on_file_resume,
+        'file_stop': _on_file_stop,
+        'home': _on_home,
+        'macro_run': _on_macro_run,
+        'macro_continue': _on_macro_continue,
+        'macro_skip': _on_macro_skip,
+        'macro_cancel': _on_macro_cancel,
+        'macro_list': _on_macro_list,
+        'macro_load': _on_macro_load,
+        'macro_save': _on_macro_save,
+        'fixture_list': _on_fixture_list,
+        'fixture_remove': _on_fixture_remove,
+        'fixture_clear': _on_fixture_clear,
+        'check_collisions': _on_check_collisions,
+        'client_log': _on_client_log,
+    }
 
-        # Enable SO_REUSEADDR to allow quick restart
-        class ReusableTCPServer(socketserver.TCPServer):
-            allow_reuse_address = True
+    async def process_request(self, connection, request):
+        """Serve jog.html over plain HTTP on the WebSocket port.
+
+        Returns None for WebSocket upgrade requests so the handshake
+        proceeds normally; plain GETs get the page on the same port,
+        so jog.html's default 'ws://' + host + '/ws' URL just works.
+        The disk read happens on the executor so a slow SD card can't
+        stall the status loop mid-cut.
+        """
+        if 'Upgrade' in request.headers:
+            return None  # WebSocket handshake — let websockets handle it
+
+        if request.path in ('/', '/index.html'):
+            # Re-read jog.html on every request so changes take effect without restart
+            html_path = Path(__file__).parent / 'jog.html'
+            try:
+                body = await asyncio.to_thread(html_path.read_bytes)
+            except OSError:
+                body = b'<h1>jog.html not found</h1>'
+
+            # ETag from the bytes just read: the browser revalidates every
+            # load (no-cache) but skips the ~100 KB transfer when the file
+            # hasn't changed, while edits still take effect immediately.
+            etag = f'"{hashlib.md5(body).hexdigest()}"'
+            if request.headers.get('If-None-Match') == etag:
+                headers = Headers([
+                    ('ETag', etag),
+                    ('Cache-Control', 'no-cache'),
+                ])
+                return Response(HTTPStatus.NOT_MODIFIED.value, 'Not Modified', headers, b'')
+
+            headers = [
+                ('Content-Type', 'text/html'),
+                ('ETag', etag),
+                ('Cache-Control', 'no-cache'),
+            ]
+            # Compress for clients that accept it; the gzipped body is
+            # cached per ETag so repeat loads don't recompress. Far-future
+            # caching is deliberately not used — jog.html is hot-reloaded.
+            if 'gzip' in request.headers.get('Accept-Encoding', ''):
+                if self._html_gz[0] != etag:
+                    gz = await asyncio.to_thread(gzip.compress, body, 6)
+                    self._html_gz = (etag, gz)
+                body = self._html_gz[1]
+                headers.append(('Content-Encoding', 'gzip'))
+            headers.append(('Content-Length', str(len(body))))
+            return Response(HTTPStatus.OK.value, 'OK', Headers(headers), body)
+
+        body = b'Not Found\n'
+        headers = Headers([
+            ('Content-Type', 'text/plain'),
+            ('Content-Length', str(len(body))),
+        ])
+        return Response(HTTPStatus.NOT_FOUND.value, 'Not Found', headers, body)
 
-        with ReusableTCPServer(('0.0.0.0', self.http_port), Handler) as httpd:
-            print(f'[HTTP] Serving on http://0.0.0.0:{self.http_port}')
-            httpd.serve_forever()
+    def stop(self):
+        """Unblock start() so the server can shut down cleanly."""
+        self._stopped.set()
 
     async def start(self):
         """Start the server."""
-        self.load_html()
-
-        # Start HTTP server in background thread
-        http_thread = threading.Thread(target=self.run_http_server, daemon=True)
-        http_thread.start()
+        # Background flusher for the serial log buffer
+        asyncio.create_task(self.logger.run_flusher())
 
         # Auto-connect to serial port
-        if os.path.exists(self.serial_port):
+        if await asyncio.to_thread(os.path.exists, self.serial_port):
             await self.grbl.connect(self.serial_port)
 
-        # Start WebSocket server
+        # Single port: HTTP for jog.html, WebSocket for everything else.
+        # permessage-deflate is tuned down from the library defaults:
+        # level 3 and 12-bit windows keep most of the shrinkage on the
+        # repetitive JSON frames at a fraction of the CPU and the
+        # per-connection zlib memory (matters on the Pi).
         async with websockets.serve(
             self.handle_client,
             '0.0.0.0',
-            self.ws_port,
+            self.http_port,
+            process_request=self.process_request,
+            extensions=[
+                ServerPerMessageDeflateFactory(
+                    server_max_window_bits=12,
+                    client_max_window_bits=12,
+                    compress_settings={'level': 3, 'memLevel': 4},
+                )
+            ],
         ):
-            print(f'[WS] WebSocket server on ws://0.0.0.0:{self.ws_port}')
-            await asyncio.Future()  # Run forever
+            print(f'[Server] HTTP + WebSocket on http://0.0.0.0:{self.http_port}')
+            await self._stopped.wait()  # Run until stop() — forever in practice
 
 # ============================================================
 # MAIN
@@ -1850,18 +2466,46 @@ def main():
     parser = argparse.ArgumentParser(description='GRBL WebSocket Server')
     parser.add_argument('--port', type=int, default=DEFAULT_HTTP_PORT, help='HTTP/WS port')
     parser.add_argument('--serial', default=DEFAULT_SERIAL_PORT, help='Serial port')
+    parser.add_argument('--cpu-pin', type=int, default=None, metavar='N',
+                        help='Pin the server to CPU core N (reduces scheduling jitter)')
+    parser.add_argument('--rt', action='store_true',
+                        help='Run under SCHED_FIFO real-time priority (needs root)')
     args = parser.parse_args()
 
+    # Optional real-time tuning: serial jitter costs motion quality, so
+    # allow pinning to a dedicated core and/or SCHED_FIFO on hosts set
+    # up for it. Both fail soft — a shared dev box just logs and moves on.
+    if args.cpu_pin is not None:
+        try:
+            os.sched_setaffinity(0, {args.cpu_pin})
+            elog(f'CPU affinity: pinned to core {args.cpu_pin}')
+        except (AttributeError, OSError) as e:
+            elog(f'CPU pin failed: {e}')
+    if args.rt:
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(20))
+            elog('Scheduler: SCHED_FIFO priority 20')
+        except (AttributeError, PermissionError, OSError) as e:
+            elog(f'SCHED_FIFO failed (need root?): {e}')
+
     server = GrblServer(args.port, args.serial)
 
     # Log version of all code files at startup
-    import hashlib, glob
+    import glob
     elog(f'SERVER VERSION: {VERSION}')
     for f in sorted(glob.glob('*.py') + glob.glob('macros/*.py')):
         h = hashlib.md5(open(f, 'rb').read()).hexdigest()[:8]
         elog(f'  {f}: {h}')
     elog(f'  jog.html: {hashlib.md5(open("jog.html", "rb").read()).hexdigest()[:8]}')
 
+    # Use uvloop when available — faster socket I/O and timer handling
+    try:
+        import uvloop
+        uvloop.install()
+        elog('Event loop: uvloop')
+    except ImportError:
+        pass
+
     try:
         asyncio.run(server.start())
     except KeyboardInterrupt:
@@ -39,10 +39,11 @@ class MacroEngine:
         self.total_steps: int = 0
         self.waiting_continue: bool = False
         self.continue_event: asyncio.Event = asyncio.Event()
-        self.cancel_flag: bool = False
+        self.cancel_event: asyncio.Event = asyncio.Event()
         self.skip_flag: bool = False
         self.broadcast_callback = None
         self.notify_callback = None  # Called when user action required (e.g. tool change)
+        self.has_clients = lambda: True  # replaced by GrblServer; guards dict builds
 
         # Stored values from SetZ
         self.probe_work_z: Optional[float] = None
@@ -65,6 +66,21 @@ class MacroEngine:
         # Fixtures list: [{x, y, z, radius}, ...]
         self.fixtures: list = []
 
+        # Single task slot — at most one macro/homing task at a time
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def cancel_flag(self) -> bool:
+        """Bool view of cancel_event — macros check `self.cancel_flag`."""
+        return self.cancel_event.is_set()
+
+    @cancel_flag.setter
+    def cancel_flag(self, value: bool):
+        if value:
+            self.cancel_event.set()
+        else:
+            self.cancel_event.clear()
+
     @property
     def loaded_gcode(self) -> str:
         """Get loaded G-code from streamer as a single string."""
@@ -198,16 +214,7 @@ class MacroEngine:
             await self._wait_idle()
 
             # Back off — user can adjust XY before slow probe
-            await self._send_and_log('G91')
-            await self._send_and_log('G0 Z2')
-            await self._wait_idle()
-            await self._send_and_log('G90')
-            await self._log('Adjust XY if needed, then press CONTINUE for slow probe')
-            await self._wait_for_continue()
-            await self._send_and_log('G91')
-            await self._send_and_log('G38.2 Z-4 F1')
-            await self._wait_idle()
-            await self._send_and_log('G90')
+            await self._backoff_and_slow_probe('G38.2 Z-4 F1')
 
             # %global.probeWorkZ = mposz
             self.probe_work_z = self.grbl.status.mpos['z']
@@ -276,19 +283,8 @@ class MacroEngine:
         await self._send_and_log(f'G38.2 Z-{probe_distance:.1f} F600')
         await self._wait_idle()
 
-        # Back off — user can adjust XY before slow probe
         await self._log(f'Fast probe contact: MPos Z={self.grbl.status.mpos["z"]:.3f} feed_override={self.grbl.status.feed_override}%')
-        await self._send_and_log('G0 Z2')
-        await self._wait_idle()
-        await self._log(f'After backoff: MPos Z={self.grbl.status.mpos["z"]:.3f}')
-        await self._send_and_log('G90')
-        await self._log('Adjust XY if needed, then press CONTINUE for slow probe')
-        await self._wait_for_continue()
-        await self._log(f'Before slow probe: MPos Z={self.grbl.status.mpos["z"]:.3f} feed_override={self.grbl.status.feed_override}%')
-        await self._send_and_log('G91')
-        await self._send_and_log('G38.2 Z-8 F2')
-        await self._wait_idle()
-        await self._send_and_log('G90')
+        await self._backoff_and_slow_probe('G38.2 Z-8 F2')
 
         # Store probe Z (machine coords)
         self.probe_work_z = self.grbl.status.mpos['z']
@@ -344,9 +340,30 @@ class MacroEngine:
         finally:
             self.running = False
 
+    async def _backoff_and_slow_probe(self, slow_cmd: str):
+        """Back off after fast probe contact, let the user adjust XY, then slow probe.
+
+        Shared by run_set_z and _probe_at_g28, which had this sequence
+        duplicated. The backoff rides distance mode on the motion line
+        ('G91 G0 Z2' — GRBL applies all modal words on a line); G90 gets
+        its own line afterwards because two distance modes on one line
+        is a modal group violation.
+        """
+        await self._send_and_log(f'G91 G0 Z{PROBE_BACKOFF}')
+        await self._wait_idle()
+        await self._log(f'After backoff: MPos Z={self.grbl.status.mpos["z"]:.3f}')
+        await self._send_and_log('G90')
+        await self._log('Adjust XY if needed, then press CONTINUE for slow probe')
+        await self._wait_for_continue()
+        await self._log(f'Before slow probe: MPos Z={self.grbl.status.mpos["z"]:.3f} feed_override={self.grbl.status.feed_override}%')
+        await self._send_and_log('G91')
+        await self._send_and_log(slow_cmd)
+        await self._wait_idle()
+        await self._send_and_log('G90')
+
     async def _log(self, msg: str):
         """Log message to clients (shows in debug console)."""
-        if self.broadcast_callback:
+        if self.broadcast_callback and self.has_clients():
             await self.broadcast_callback({
                 'type': 'macro_log',
                 'name': self.current_macro,
@@ -470,14 +487,22 @@ class MacroEngine:
                 'step': self.current_step,
                 'waiting': True,
             })
-        # Wait for continue or cancel
-        await self.continue_event.wait()
+        # Race continue against cancel so cancel wakes the wait directly
+        # instead of relying on cancel() also setting continue_event
+        continue_task = asyncio.create_task(self.continue_event.wait())
+        cancel_task = asyncio.create_task(self.cancel_event.wait())
+        _, pending = await asyncio.wait(
+            {continue_task, cancel_task},
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        for task in pending:
+            task.cancel()
         if self.cancel_flag:
             raise Exception('Macro cancelled')
 
     async def _report_step(self, name: str, cmd: str, waiting: bool = False):
         """Report macro step to clients."""
-        if self.broadcast_callback:
+        if self.broadcast_callback and self.has_clients():
             await self.broadcast_callback({
                 'type': 'macro_status',
                 'name': self.current_macro,
@@ -491,7 +516,7 @@ class MacroEngine:
     async def _report_done(self):
         """Report macro completion. Clears last_error."""
         self.last_error = ''
-        if self.broadcast_callback:
+        if self.broadcast_callback and self.has_clients():
             await self.broadcast_callback({
                 'type': 'macro_done',
                 'name': self.current_macro,
@@ -500,7 +525,7 @@ class MacroEngine:
     async def _report_error(self, error: str):
         """Report macro error. Sets last_error for callers to check."""
         self.last_error = error
-        if self.broadcast_callback:
+        if self.broadcast_callback and self.has_clients():
             await self.broadcast_callback({
                 'type': 'macro_error',
                 'name': self.current_macro,
@@ -512,6 +537,20 @@ class MacroEngine:
         """Continue from M0 wait."""
         self.continue_event.set()
 
+    def try_start(self, coro) -> bool:
+        """Start a macro coroutine in the single task slot.
+
+        Returns False (and closes the coroutine) when one is already
+        running — a double-clicked button must not race two macros on
+        the same serial port. Holding the task also keeps it referenced
+        so it can't be garbage-collected mid-run.
+        """
+        if self._task and not self._task.done():
+            coro.close()
+            return False
+        self._task = asyncio.create_task(coro)
+        return True
+
     def cancel(self):
         """Cancel running macro."""
         self.cancel_flag = True